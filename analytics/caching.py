@@ -5,17 +5,20 @@ Redis-backed caching for dashboard and metrics endpoints.
 import hashlib
 import json
 import logging
+import time
 from functools import wraps
-from typing import Any, Optional, Callable
+from typing import Any, Optional, Callable, Tuple
 
 from django.core.cache import cache
 from django.conf import settings
+from rest_framework.renderers import JSONRenderer
 
 logger = logging.getLogger(__name__)
 
 # Cache TTL in seconds
 DASHBOARD_CACHE_TTL = 300  # 5 minutes
 METRICS_CACHE_TTL = 300    # 5 minutes
+TEAM_IDS_CACHE_TTL = 60    # 1 minute, also invalidated on ReportingLine changes
 
 
 def _hash_params(params: dict) -> str:
@@ -25,13 +28,15 @@ def _hash_params(params: dict) -> str:
     return hashlib.md5(params_str.encode()).hexdigest()[:12]
 
 
-def build_dashboard_cache_key(dashboard_type: str, user_id: int, **params) -> str:
+def build_dashboard_cache_key(dashboard_type: str, user_id: Optional[int], **params) -> str:
     """
     Build cache key for dashboard endpoints.
     Key: dashboard:{role}:{user_id}:{params_hash}
+    Pass user_id=None for dashboards whose data is the same for every caller.
     """
     params_hash = _hash_params(params)
-    return f"analytics:dashboard:{dashboard_type}:{user_id}:{params_hash}"
+    user_id_str = str(user_id) if user_id is not None else 'global'
+    return f"analytics:dashboard:{dashboard_type}:{user_id_str}:{params_hash}"
 
 
 def build_metrics_cache_key(model: str, **params) -> str:
@@ -61,6 +66,14 @@ def build_trend_cache_key(model: str, scope: str, scope_id: Optional[int], month
     return f"analytics:trend:{model}:{scope}:{scope_id_str}:{months}"
 
 
+def build_team_ids_cache_key(manager_id: int) -> str:
+    """
+    Build cache key for a manager's team member IDs.
+    Key: team_ids:{manager_id}
+    """
+    return f"analytics:team_ids:{manager_id}"
+
+
 def get_cached(key: str) -> Optional[Any]:
     """Get value from cache if available."""
     try:
@@ -78,6 +91,27 @@ def set_cached(key: str, value: Any, ttl: int = DASHBOARD_CACHE_TTL):
         logger.warning(f"Cache set error for {key}: {e}")
 
 
+def get_cached_response(key: str) -> Optional[Tuple[bytes, float]]:
+    """
+    Get a cached response entry if available.
+    Entries are (json_body, cached_at) where cached_at is a UNIX timestamp.
+    """
+    entry = get_cached(key)
+    return entry if isinstance(entry, tuple) else None
+
+
+def set_cached_response(key: str, data: Any, ttl: int = DASHBOARD_CACHE_TTL) -> Tuple[bytes, float]:
+    """
+    Encode response data to JSON once and cache it with its birth time.
+    Cache hits can then be served without re-running the renderer, and the
+    birth time lets the view tell clients how long the body stays fresh.
+    Returns the cached entry so the caller can send it directly.
+    """
+    entry = (JSONRenderer().render(data), time.time())
+    set_cached(key, entry, ttl)
+    return entry
+
+
 def delete_cached(key: str):
     """Delete value from cache."""
     try:
@@ -8,7 +8,7 @@ import io
 import logging
 from datetime import date, timedelta
 from decimal import Decimal
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, Tuple
 
 from django.db.models import Sum, Count, Avg, Q
 from django.db.models.functions import Coalesce
@@ -28,6 +28,9 @@ from .models import (
 from .exceptions import (
     ForbiddenScopeError, ValidationError, ExportLimitExceededError
 )
+from .caching import (
+    build_team_ids_cache_key, get_cached, set_cached, TEAM_IDS_CACHE_TTL
+)
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -55,15 +58,25 @@ def build_metrics_cache_key(model: str, **params) -> str:
 # Role Checking Helpers
 # =============================================================================
 
-def is_finance_or_admin(user) -> bool:
-    """Check if user has finance or admin role."""
+def _memoize_on_user(user, attr: str, compute) -> bool:
+    """
+    Cache a role check on the user instance.
+    request.user is loaded per request, so the value lives for one request.
+    """
+    value = getattr(user, attr, None)
+    if value is None:
+        value = compute(user)
+        setattr(user, attr, value)
+    return value
+
+
+def _compute_is_finance_or_admin(user) -> bool:
     role = getattr(user, 'role', '')
     role_value = role.lower() if isinstance(role, str) else role
     return user.is_staff or user.is_superuser or role_value in ['finance', 'admin', 'director']
 
 
-def is_manager(user) -> bool:
-    """Check if user is a manager (has direct reports)."""
+def _compute_is_manager(user) -> bool:
     role = getattr(user, 'role', '')
     role_value = role.lower().strip() if isinstance(role, str) else role
     if user.is_staff or user.is_superuser:
@@ -75,6 +88,16 @@ def is_manager(user) -> bool:
     return ReportingLine.objects.filter(manager=user, is_active=True).exists()
 
 
+def is_finance_or_admin(user) -> bool:
+    """Check if user has finance or admin role."""
+    return _memoize_on_user(user, '_analytics_is_finance_or_admin', _compute_is_finance_or_admin)
+
+
+def is_manager(user) -> bool:
+    """Check if user is a manager (has direct reports)."""
+    return _memoize_on_user(user, '_analytics_is_manager', _compute_is_manager)
+
+
 def get_team_member_ids(manager) -> List[int]:
     """Get IDs of all team members for a manager."""
     return list(
@@ -83,6 +106,19 @@ def get_team_member_ids(manager) -> List[int]:
     )
 
 
+def get_team_member_ids_cached(manager) -> List[int]:
+    """
+    Get team member IDs, served from cache when available.
+    Entries are dropped by the ReportingLine signals when the team changes.
+    """
+    key = build_team_ids_cache_key(manager.id)
+    ids = get_cached(key)
+    if ids is None:
+        ids = get_team_member_ids(manager)
+        set_cached(key, ids, TEAM_IDS_CACHE_TTL)
+    return ids
+
+
 # =============================================================================
 # Dashboard Services
 # =============================================================================
@@ -103,9 +139,9 @@ class FinanceDashboardService:
                 current_role='consultant'
             )
         
-        year = year or timezone.now().year
-        year_start = date(year, 1, 1)
         today = timezone.now().date()
+        year = year or today.year
+        year_start = date(year, 1, 1)
         
         # Get YTD paid amount from PayoutSummary
         paid_ytd = PayoutSummary.objects.filter(
@@ -171,13 +207,14 @@ class FinanceDashboardService:
         if limit > 50:
             limit = 50
         
-        year = timezone.now().year
+        today = timezone.now().date()
+        year = today.year
         if period == 'YTD':
             start_date = date(year, 1, 1)
         elif period == 'MONTH':
-            start_date = timezone.now().date().replace(day=1)
+            start_date = today.replace(day=1)
         elif period == 'QUARTER':
-            month = timezone.now().month
+            month = today.month
             quarter_start_month = ((month - 1) // 3) * 3 + 1
             start_date = date(year, quarter_start_month, 1)
         else:
@@ -670,6 +707,21 @@ class BaseExportService:
         writer.writerow(headers)
         writer.writerows(rows)
         return output.getvalue()
+    
+    @classmethod
+    def _stream_csv(cls, headers: List[str], rows: Iterable[List]) -> Tuple[str, int]:
+        """
+        Generate CSV content from a row iterator, writing each row as it arrives.
+        Returns the content and the number of data rows written.
+        """
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(headers)
+        row_count = 0
+        for row in rows:
+            writer.writerow(row)
+            row_count += 1
+        return output.getvalue(), row_count
 
 
 class CommissionDetailExportService(BaseExportService):
@@ -714,11 +766,12 @@ class CommissionDetailExportService(BaseExportService):
             count = Commission.objects.filter(query).count()
             cls._check_row_limit(count)
             
-            # Get data
+            # Get data: rows are fetched in chunks and written to the CSV as they
+            # arrive, so neither model instances nor row lists pile up in memory
             commissions = Commission.objects.filter(query).select_related('consultant').order_by('-created_at')
             
             headers = ['ID', 'Date', 'Consultant', 'Amount', 'Type', 'Status', 'Description']
-            rows = [
+            rows = (
                 [
                     c.id,
                     c.created_at.date().isoformat(),
@@ -728,15 +781,15 @@ class CommissionDetailExportService(BaseExportService):
                     c.state,
                     c.notes[:50] if c.notes else ''
                 ]
-                for c in commissions
-            ]
+                for c in commissions.iterator(chunk_size=500)
+            )
             
-            content = cls._generate_csv(headers, rows)
+            content, row_count = cls._stream_csv(headers, rows)
             
             # Update export log
-            export_log.mark_completed(len(rows), len(content.encode('utf-8')))
+            export_log.mark_completed(row_count, len(content.encode('utf-8')))
             
-            return content, f"commission_report_{start_date}_{end_date}.csv", len(rows)
+            return content, f"commission_report_{start_date}_{end_date}.csv", row_count
             
         except Exception as e:
             export_log.mark_failed(str(e))
@@ -0,0 +1,35 @@
+"""
+Analytics Signals
+Cache invalidation for analytics data derived from other apps.
+"""
+import logging
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+
+from .caching import build_team_ids_cache_key, delete_cached
+
+logger = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Hierarchy Signals (Phase 1)
+# =============================================================================
+
+@receiver(pre_save, sender='hierarchy.ReportingLine')
+@receiver(pre_delete, sender='hierarchy.ReportingLine')
+def remember_reporting_line_manager(sender, instance, **kwargs):
+    """Note the stored manager, so moving a line also clears the previous manager's team."""
+    instance._stored_manager_id = None
+    if instance.pk:
+        instance._stored_manager_id = (
+            sender.objects.filter(pk=instance.pk).values_list('manager_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender='hierarchy.ReportingLine')
+@receiver(post_delete, sender='hierarchy.ReportingLine')
+def on_reporting_line_changed(sender, instance, **kwargs):
+    """Drop the cached team member IDs for the current and previous managers."""
+    manager_ids = {instance.manager_id, getattr(instance, '_stored_manager_id', None)}
+    for manager_id in manager_ids - {None}:
+        delete_cached(build_team_ids_cache_key(manager_id))
@@ -2,6 +2,7 @@
 Phase 6.5 Analytics Verification Tests
 Comprehensive test suite for Analytics & Reporting module.
 """
+import time
 from datetime import date, timedelta
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
@@ -58,10 +59,11 @@ class FinanceDashboardTests(APITestCase):
         self.client.force_authenticate(user=self.admin)
         response = self.client.get('/api/analytics/dashboards/finance/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('summary', response.data)
-        self.assertIn('commission_trend', response.data)
-        self.assertIn('top_performers', response.data)
-        self.assertIn('reconciliation_status', response.data)
+        data = response.json()
+        self.assertIn('summary', data)
+        self.assertIn('commission_trend', data)
+        self.assertIn('top_performers', data)
+        self.assertIn('reconciliation_status', data)
     
     def test_finance_dashboard_denied_consultant(self):
         """Consultant cannot access finance dashboard."""
@@ -93,8 +95,8 @@ class ManagerDashboardTests(APITestCase):
         self.client.force_authenticate(user=self.manager)
         response = self.client.get('/api/analytics/dashboards/manager/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('summary', response.data)
-        self.assertEqual(response.data['summary']['team_size'], 1)
+        self.assertIn('summary', response.json())
+        self.assertEqual(response.json()['summary']['team_size'], 1)
     
     def test_manager_dashboard_denied_non_manager(self):
         """Non-manager cannot access manager dashboard."""
@@ -117,9 +119,45 @@ class ConsultantDashboardTests(APITestCase):
         self.client.force_authenticate(user=self.consultant)
         response = self.client.get('/api/analytics/dashboards/consultant/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('summary', response.data)
-        self.assertIn('earnings_trend', response.data)
-        self.assertIn('recent_payouts', response.data)
+        data = response.json()
+        self.assertIn('summary', data)
+        self.assertIn('earnings_trend', data)
+        self.assertIn('recent_payouts', data)
+
+
+class PendingCountTests(APITestCase):
+    """Test real-time pending count for managers."""
+    
+    def setUp(self):
+        self.manager = User.objects.create_user(
+            username='manager1', email='manager@test.com', password='testpass123'
+        )
+        self.consultant = User.objects.create_user(
+            username='consultant1', email='c1@test.com', password='testpass123'
+        )
+        ReportingLine.objects.create(
+            manager=self.manager, consultant=self.consultant, start_date=date.today()
+        )
+        for ref, state in [('PC-001', 'submitted'), ('PC-002', 'submitted'), ('PC-003', 'draft')]:
+            Commission.objects.create(
+                commission_type='base',
+                consultant=self.consultant,
+                transaction_date=date.today(),
+                sale_amount=Decimal('1000.00'),
+                commission_rate=Decimal('10.00'),
+                calculated_amount=Decimal('100.00'),
+                reference_number=ref,
+                state=state
+            )
+        self.client = APIClient()
+    
+    def test_pending_count_sums_submitted_team_commissions(self):
+        """Only submitted commissions of team members are counted."""
+        self.client.force_authenticate(user=self.manager)
+        response = self.client.get('/api/analytics/commissions/pending-count/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pending_count'], 2)
+        self.assertEqual(Decimal(response.data['pending_amount']), Decimal('200.00'))
 
 
 # =============================================================================
@@ -214,31 +252,91 @@ class CachingTests(APITestCase):
         )
         self.client = APIClient()
     
-    @patch('analytics.views.get_cached')
-    @patch('analytics.views.set_cached')
+    @patch('analytics.views.get_cached_response')
+    @patch('analytics.views.set_cached_response')
     def test_cache_hit_returns_cached_data(self, mock_set, mock_get):
-        """Cached data is returned on cache hit."""
+        """Cached bytes are returned as-is on cache hit."""
         cached_response = {'summary': {'test': 'cached'}}
-        mock_get.return_value = cached_response
+        mock_get.return_value = (b'{"summary":{"test":"cached"}}', time.time())
         
         self.client.force_authenticate(user=self.admin)
         response = self.client.get('/api/analytics/dashboards/finance/')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, cached_response)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json(), cached_response)
         mock_set.assert_not_called()  # Should not set cache on hit
     
-    @patch('analytics.views.get_cached')
-    @patch('analytics.views.set_cached')
+    @patch('analytics.views.get_cached_response')
+    @patch('analytics.views.set_cached_response')
     def test_cache_miss_calls_service(self, mock_set, mock_get):
         """Cache miss triggers service call and caches result."""
         mock_get.return_value = None  # Cache miss
+        mock_set.return_value = (b'{}', time.time())
         
         self.client.force_authenticate(user=self.admin)
         response = self.client.get('/api/analytics/dashboards/finance/')
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         mock_set.assert_called_once()  # Should cache the result
+    
+    def test_cached_body_is_reused(self):
+        """Second request is served from the pre-encoded cache entry."""
+        from django.core.cache import cache
+        cache.clear()
+        
+        self.client.force_authenticate(user=self.admin)
+        first = self.client.get('/api/analytics/dashboards/finance/')
+        with patch('analytics.views.FinanceDashboardService.get_summary') as mock_summary:
+            second = self.client.get('/api/analytics/dashboards/finance/')
+            mock_summary.assert_not_called()
+        
+        self.assertEqual(first.content, second.content)
+    
+    def test_finance_dashboard_cache_shared_across_users(self):
+        """Finance data is org-wide, so a second admin reuses the first admin's entry."""
+        from django.core.cache import cache
+        cache.clear()
+        other_admin = User.objects.create_superuser(
+            username='admin2', email='admin2@test.com', password='testpass123'
+        )
+        
+        self.client.force_authenticate(user=self.admin)
+        first = self.client.get('/api/analytics/dashboards/finance/')
+        self.client.force_authenticate(user=other_admin)
+        with patch('analytics.views.FinanceDashboardService.get_top_performers') as mock_top:
+            second = self.client.get('/api/analytics/dashboards/finance/')
+            mock_top.assert_not_called()
+        
+        self.assertEqual(first.content, second.content)
+    
+    def test_shared_finance_cache_still_checks_role(self):
+        """A warm shared entry is never served to non-finance users."""
+        consultant = User.objects.create_user(
+            username='consultant1', email='consultant@test.com', password='testpass123'
+        )
+        with patch('analytics.views.get_cached_response') as mock_get:
+            mock_get.return_value = (b'{}', time.time())
+            self.client.force_authenticate(user=consultant)
+            response = self.client.get('/api/analytics/dashboards/finance/')
+        
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        mock_get.assert_not_called()
+    
+    def test_cache_control_reflects_remaining_ttl(self):
+        """Hits advertise only the time left on the server-side entry."""
+        from analytics.caching import DASHBOARD_CACHE_TTL
+        
+        with patch('analytics.views.get_cached_response') as mock_get:
+            mock_get.return_value = (b'{}', time.time() - 100)
+            self.client.force_authenticate(user=self.admin)
+            response = self.client.get('/api/analytics/dashboards/finance/')
+        
+        self.assertIn('private', response['Cache-Control'])
+        max_age = int(response['Cache-Control'].split('max-age=')[1].split(',')[0])
+        self.assertLessEqual(max_age, DASHBOARD_CACHE_TTL - 100)
+        self.assertGreater(max_age, DASHBOARD_CACHE_TTL - 110)
+        self.assertTrue(response.has_header('Expires'))
 
 
 class CacheIsolationTests(TestCase):
@@ -263,6 +361,78 @@ class CacheIsolationTests(TestCase):
         key2 = build_dashboard_cache_key('finance', 1, year=2026, months=12)
         
         self.assertEqual(key1, key2)
+    
+    def test_global_dashboard_key_has_no_user(self):
+        """user_id=None builds a key shared by every caller."""
+        from analytics.caching import build_dashboard_cache_key
+        
+        key = build_dashboard_cache_key('finance', None, year=2026)
+        
+        self.assertIn(':global:', key)
+        self.assertNotEqual(key, build_dashboard_cache_key('finance', 1, year=2026))
+
+
+class TeamIdsCacheTests(TestCase):
+    """Test cached team member IDs and their invalidation."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.manager = User.objects.create_user(
+            username='manager1', email='manager@test.com', password='testpass123'
+        )
+        self.consultant1 = User.objects.create_user(
+            username='consultant1', email='c1@test.com', password='testpass123'
+        )
+        self.consultant2 = User.objects.create_user(
+            username='consultant2', email='c2@test.com', password='testpass123'
+        )
+        ReportingLine.objects.create(
+            manager=self.manager, consultant=self.consultant1, start_date=date.today()
+        )
+    
+    def test_team_ids_served_from_cache(self):
+        """Second lookup does not hit the database."""
+        from analytics.services import get_team_member_ids_cached
+        
+        self.assertEqual(get_team_member_ids_cached(self.manager), [self.consultant1.id])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_team_member_ids_cached(self.manager), [self.consultant1.id])
+    
+    def test_reporting_line_change_invalidates_cache(self):
+        """Adding a team member drops the cached IDs for that manager."""
+        from analytics.services import get_team_member_ids_cached
+        
+        get_team_member_ids_cached(self.manager)
+        ReportingLine.objects.create(
+            manager=self.manager, consultant=self.consultant2, start_date=date.today()
+        )
+        self.assertCountEqual(
+            get_team_member_ids_cached(self.manager),
+            [self.consultant1.id, self.consultant2.id]
+        )
+
+    
+    def test_moving_a_line_invalidates_previous_manager(self):
+        """Reassigning a consultant drops the old manager's cached IDs too."""
+        from analytics.services import get_team_member_ids_cached
+        
+        other_manager = User.objects.create_user(
+            username='manager2', email='manager2@test.com', password='testpass123'
+        )
+        get_team_member_ids_cached(self.manager)
+        get_team_member_ids_cached(other_manager)
+        
+        line = ReportingLine.objects.get(consultant=self.consultant1)
+        line.manager = other_manager
+        line.save()
+        self.assertEqual(get_team_member_ids_cached(self.manager), [])
+        self.assertEqual(get_team_member_ids_cached(other_manager), [self.consultant1.id])
+        
+        # A stale in-memory manager still clears the stored one on delete
+        line.manager = self.manager
+        line.delete()
+        self.assertEqual(get_team_member_ids_cached(other_manager), [])
 
 
 # =============================================================================
@@ -378,8 +548,7 @@ class ExportLogTests(APITestCase):
         self.client.force_authenticate(user=self.admin)
         response = self.client.get('/api/analytics/reports/commission-detail/', {
             'start_date': '2026-01-01',
-            'end_date': '2026-01-31',
-            'format': 'csv'
+            'end_date': '2026-01-31'
         })
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -388,6 +557,53 @@ class ExportLogTests(APITestCase):
         log = ExportLog.objects.latest('created_at')
         self.assertEqual(log.user, self.admin)
         self.assertEqual(log.report_type, ReportType.COMMISSION_DETAIL)
+    
+    def test_commission_export_streams_rows_into_csv(self):
+        """Streamed rows are all written and counted in the log."""
+        from analytics.services import CommissionDetailExportService
+        
+        for ref in ('EXP-001', 'EXP-002'):
+            Commission.objects.create(
+                commission_type='base', consultant=self.admin,
+                transaction_date=date.today(), sale_amount=Decimal('100.00'),
+                commission_rate=Decimal('10.00'), calculated_amount=Decimal('10.00'),
+                reference_number=ref
+            )
+        
+        content, filename, row_count = CommissionDetailExportService.export(
+            user=self.admin, start_date=date.today(), end_date=date.today()
+        )
+        
+        self.assertEqual(row_count, 2)
+        self.assertEqual(len(content.strip().splitlines()), 3)
+        self.assertTrue(content.startswith('ID,Date,Consultant'))
+        self.assertEqual(ExportLog.objects.latest('created_at').row_count, 2)
+
+
+class RoleCheckMemoizationTests(TestCase):
+    """Test per-request memoization of role helpers."""
+    
+    def setUp(self):
+        self.manager = User.objects.create_user(
+            username='manager1', email='manager@test.com', password='testpass123'
+        )
+        self.consultant = User.objects.create_user(
+            username='consultant1', email='c1@test.com', password='testpass123'
+        )
+        ReportingLine.objects.create(
+            manager=self.manager, consultant=self.consultant, start_date=date.today()
+        )
+    
+    def test_is_manager_queries_once_per_user_instance(self):
+        """Repeated is_manager checks reuse the first result."""
+        with self.assertNumQueries(1):
+            self.assertTrue(is_manager(self.manager))
+            self.assertTrue(is_manager(self.manager))
+        
+        fresh = User.objects.get(pk=self.consultant.pk)
+        with self.assertNumQueries(1):
+            self.assertFalse(is_manager(fresh))
+            self.assertFalse(is_manager(fresh))
 
 
 # =============================================================================
@@ -2,10 +2,13 @@
 Analytics Throttling
 Custom throttle classes for rate limiting.
 """
+from rest_framework.exceptions import Throttled
 from rest_framework.throttling import UserRateThrottle
 from rest_framework.views import exception_handler
 from rest_framework.response import Response
 
+from .exceptions import AnalyticsError
+
 
 class AnalyticsDashboardThrottle(UserRateThrottle):
     """
@@ -31,32 +34,50 @@ class AnalyticsExportThrottle(UserRateThrottle):
     rate = '10/min'
 
 
+def _throttled_response(exc, context):
+    """Standard envelope for rate-limited requests."""
+    return Response(
+        {
+            'error': 'rate_limited',
+            'message': 'Too many requests',
+            'details': {
+                'retry_after': exc.wait
+            }
+        },
+        status=429
+    )
+
+
+def _analytics_error_response(exc, context):
+    """Standard envelope for custom analytics exceptions."""
+    return Response(
+        exc.to_dict(),
+        status=exc.status_code
+    )
+
+
+# Exception class -> response builder, resolved along the exception's MRO
+_EXCEPTION_HANDLERS = {
+    Throttled: _throttled_response,
+    AnalyticsError: _analytics_error_response,
+}
+
+
+def _get_handler(exc):
+    for klass in type(exc).__mro__:
+        handler = _EXCEPTION_HANDLERS.get(klass)
+        if handler is not None:
+            return handler
+    return None
+
+
 def analytics_exception_handler(exc, context):
     """
     Custom exception handler that returns standard error envelope for 429.
     """
-    from rest_framework.exceptions import Throttled
-    from .exceptions import AnalyticsError
-    
-    # Handle Throttled exceptions
-    if isinstance(exc, Throttled):
-        return Response(
-            {
-                'error': 'rate_limited',
-                'message': 'Too many requests',
-                'details': {
-                    'retry_after': exc.wait
-                }
-            },
-            status=429
-        )
-    
-    # Handle custom analytics exceptions
-    if isinstance(exc, AnalyticsError):
-        return Response(
-            exc.to_dict(),
-            status=exc.status_code
-        )
+    handler = _get_handler(exc)
+    if handler is not None:
+        return handler(exc, context)
     
     # Default handling for other exceptions
     response = exception_handler(exc, context)
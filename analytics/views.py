@@ -4,9 +4,11 @@ All 17 endpoints as specified in Phase 6.3 API Design.
 Views only call services - no business logic here.
 With caching and rate limiting applied.
 """
-from datetime import date
+import time
+from datetime import date, timedelta
 
 from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_response_headers
 from django.utils import timezone
 from django.db.models import Sum, Count
 from django.db.models.functions import Coalesce
@@ -45,10 +47,9 @@ from .services import (
     ExportLogService,
     is_finance_or_admin,
     is_manager,
-    get_team_member_ids,
+    get_team_member_ids_cached,
 )
 from .exceptions import (
-    AnalyticsError,
     ForbiddenScopeError,
     ValidationError,
     ExportLimitExceededError,
@@ -57,14 +58,15 @@ from .throttling import (
     AnalyticsDashboardThrottle,
     AnalyticsMetricsThrottle,
     AnalyticsExportThrottle,
+    analytics_exception_handler,
 )
 from .caching import (
     build_dashboard_cache_key,
     build_metrics_cache_key,
     build_top_performers_cache_key,
     build_trend_cache_key,
-    get_cached,
-    set_cached,
+    get_cached_response,
+    set_cached_response,
     DASHBOARD_CACHE_TTL,
 )
 
@@ -77,31 +79,26 @@ def get_client_ip(request):
     return request.META.get('REMOTE_ADDR')
 
 
+def json_response(entry, ttl: int = DASHBOARD_CACHE_TTL) -> HttpResponse:
+    """
+    Send a cached (json_body, cached_at) entry without going through the DRF renderer.
+    Cache-Control/Expires reflect the time left on the server-side entry.
+    """
+    blob, cached_at = entry
+    response = HttpResponse(blob, content_type='application/json')
+    remaining = max(0, int(ttl - (time.time() - cached_at)))
+    patch_response_headers(response, remaining)
+    patch_cache_control(response, private=True)
+    return response
+
+
 class AnalyticsAPIView(APIView):
     """Base view for analytics endpoints with error handling."""
     permission_classes = [IsAuthenticated]
     
-    def handle_exception(self, exc):
+    def get_exception_handler(self):
         """Convert custom exceptions to standard error envelope."""
-        from rest_framework.exceptions import Throttled
-        
-        # Handle throttled exceptions with standard envelope
-        if isinstance(exc, Throttled):
-            return Response(
-                {
-                    'error': 'rate_limited',
-                    'message': 'Too many requests',
-                    'details': {'retry_after': exc.wait}
-                },
-                status=429
-            )
-        
-        if isinstance(exc, AnalyticsError):
-            return Response(
-                exc.to_dict(),
-                status=exc.status_code
-            )
-        return super().handle_exception(exc)
+        return analytics_exception_handler
 
 
 # =============================================================================
@@ -119,27 +116,34 @@ class FinanceDashboardView(AnalyticsAPIView):
         serializer = DashboardQuerySerializer(data=request.query_params)
         serializer.is_valid(raise_exception=True)
         params = serializer.validated_data
+        now = timezone.now()
         
-        year = params.get('year', timezone.now().year)
+        year = params.get('year', now.year)
         months = params.get('months', 12)
         
-        # Check cache
-        cache_key = build_dashboard_cache_key('finance', request.user.id, year=year, months=months)
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        if not is_finance_or_admin(request.user):
+            raise ForbiddenScopeError(
+                "Finance dashboard is only accessible to Finance/Admin users",
+                required_role='finance_admin',
+                current_role='consultant'
+            )
+        
+        # Check cache (org-wide data, shared by all Finance/Admin users)
+        cache_key = build_dashboard_cache_key('finance', None, year=year, months=months)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         response_data = {
             'summary': FinanceDashboardService.get_summary(request.user, year),
             'commission_trend': FinanceDashboardService.get_commission_trend(request.user, months),
             'top_performers': FinanceDashboardService.get_top_performers(request.user),
             'reconciliation_status': FinanceDashboardService.get_reconciliation_status(request.user),
-            'computed_at': timezone.now().isoformat(),
-            'cache_expires_at': (timezone.now() + timezone.timedelta(minutes=5)).isoformat()
+            'computed_at': now.isoformat()
         }
         
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class ManagerDashboardView(AnalyticsAPIView):
@@ -158,9 +162,9 @@ class ManagerDashboardView(AnalyticsAPIView):
         
         # Check cache
         cache_key = build_dashboard_cache_key('manager', request.user.id, months=months)
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         response_data = {
             'summary': ManagerDashboardService.get_summary(request.user),
@@ -169,8 +173,8 @@ class ManagerDashboardView(AnalyticsAPIView):
             'computed_at': timezone.now().isoformat()
         }
         
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class ConsultantDashboardView(AnalyticsAPIView):
@@ -189,9 +193,9 @@ class ConsultantDashboardView(AnalyticsAPIView):
         
         # Check cache
         cache_key = build_dashboard_cache_key('consultant', request.user.id, months=months)
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         response_data = {
             'summary': ConsultantDashboardService.get_summary(request.user),
@@ -200,8 +204,8 @@ class ConsultantDashboardView(AnalyticsAPIView):
             'computed_at': timezone.now().isoformat()
         }
         
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 # =============================================================================
@@ -226,9 +230,9 @@ class CommissionMetricsView(AnalyticsAPIView):
             user_id=request.user.id,
             **{k: str(v) for k, v in params.items() if v is not None}
         )
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         results = CommissionMetricsService.get_metrics(
             user=request.user,
@@ -240,8 +244,8 @@ class CommissionMetricsView(AnalyticsAPIView):
         )
         
         response_data = {'results': results, 'count': len(results)}
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class PayoutMetricsView(AnalyticsAPIView):
@@ -262,9 +266,9 @@ class PayoutMetricsView(AnalyticsAPIView):
             user_id=request.user.id,
             **{k: str(v) for k, v in params.items() if v is not None}
         )
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         results = PayoutMetricsService.get_metrics(
             user=request.user,
@@ -276,8 +280,8 @@ class PayoutMetricsView(AnalyticsAPIView):
         )
         
         response_data = {'results': results, 'count': len(results)}
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class TaxMetricsView(AnalyticsAPIView):
@@ -298,9 +302,9 @@ class TaxMetricsView(AnalyticsAPIView):
             user_id=request.user.id,
             **{k: str(v) for k, v in params.items() if v is not None}
         )
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         results = TaxMetricsService.get_metrics(
             user=request.user,
@@ -312,8 +316,8 @@ class TaxMetricsView(AnalyticsAPIView):
         )
         
         response_data = {'results': results, 'count': len(results)}
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class ReconciliationMetricsView(AnalyticsAPIView):
@@ -333,9 +337,9 @@ class ReconciliationMetricsView(AnalyticsAPIView):
             'reconciliation',
             **{k: str(v) for k, v in params.items() if v is not None}
         )
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         results = ReconciliationMetricsService.get_metrics(
             user=request.user,
@@ -345,8 +349,8 @@ class ReconciliationMetricsView(AnalyticsAPIView):
         )
         
         response_data = {'results': results, 'count': len(results)}
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class TopPerformersView(AnalyticsAPIView):
@@ -376,9 +380,9 @@ class TopPerformersView(AnalyticsAPIView):
         
         # Check cache
         cache_key = build_top_performers_cache_key(scope, scope_id, period)
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         # Get results
         if scope == 'global':
@@ -387,8 +391,8 @@ class TopPerformersView(AnalyticsAPIView):
             results = ManagerDashboardService.get_top_team_members(request.user, limit=limit)
         
         response_data = {'period': period, 'results': results}
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class CommissionTrendView(AnalyticsAPIView):
@@ -418,9 +422,9 @@ class CommissionTrendView(AnalyticsAPIView):
         
         # Check cache
         cache_key = build_trend_cache_key('commission', scope, scope_id, months)
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         # Get results
         if scope == 'global':
@@ -431,8 +435,8 @@ class CommissionTrendView(AnalyticsAPIView):
             results = ConsultantDashboardService.get_earnings_trend(request.user, months)
         
         response_data = {'results': results}
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class PayoutTrendView(AnalyticsAPIView):
@@ -462,13 +466,12 @@ class PayoutTrendView(AnalyticsAPIView):
         
         # Check cache
         cache_key = build_trend_cache_key('payout', scope, scope_id, months)
-        cached = get_cached(cache_key)
-        if cached:
-            return Response(cached)
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return json_response(cached)
         
         # Use payout summary data
         from .models import PayoutSummary, WindowType, ScopeType
-        from datetime import timedelta
         
         end_date = timezone.now().date().replace(day=1)
         start_date = end_date - timedelta(days=30 * months)
@@ -506,8 +509,8 @@ class PayoutTrendView(AnalyticsAPIView):
         ]
         
         response_data = {'results': results}
-        set_cached(cache_key, response_data, DASHBOARD_CACHE_TTL)
-        return Response(response_data)
+        entry = set_cached_response(cache_key, response_data, DASHBOARD_CACHE_TTL)
+        return json_response(entry)
 
 
 class PendingCountView(AnalyticsAPIView):
@@ -522,14 +525,14 @@ class PendingCountView(AnalyticsAPIView):
         if not is_manager(request.user):
             raise ForbiddenScopeError("Pending count is only accessible to Managers")
         
-        team_ids = get_team_member_ids(request.user)
+        team_ids = get_team_member_ids_cached(request.user)
         
         pending = Commission.objects.filter(
-            consultant_id__in=team_ids,
-            status='SUBMITTED'
+            state='submitted',
+            consultant_id__in=team_ids
         ).aggregate(
             count=Count('id'),
-            amount=Coalesce(Sum('amount'), Decimal('0'))
+            amount=Coalesce(Sum('calculated_amount'), Decimal('0'))
         )
         
         return Response({
@@ -641,7 +644,10 @@ class ReconciliationExportView(AnalyticsAPIView):
         summaries = ReconciliationSummary.objects.filter(
             period_start__gte=params['start_date'],
             period_end__lte=params['end_date']
-        ).order_by('-period_start')
+        ).only(
+            'period_start', 'period_end', 'window', 'total_batches',
+            'matched_count', 'pending_count', 'discrepancy_count', 'total_discrepancy'
+        ).order_by('-period_start').iterator(chunk_size=2000)
         
         import csv
         import io
@@ -1,18 +1,24 @@
 from django.contrib import admin
+from django.db.models import F
 from .models import Commission
 
+NOTES_SEARCH_PREFIX = 'notes:'
+
 
 @admin.register(Commission)
 class CommissionAdmin(admin.ModelAdmin):
     list_display = [
-        'id', 'commission_type', 'consultant', 'manager',
+        'id', 'commission_type', 'consultant_username', 'manager_username',
         'calculated_amount', 'state', 'transaction_date', 'created_at'
     ]
     list_filter = ['commission_type', 'state', 'transaction_date', 'created_at']
+    # Exact reference match plus usernames; the notes TextField is only
+    # searched on request (see get_search_results)
     search_fields = [
-        'consultant__username', 'manager__username',
-        'reference_number', 'notes'
+        '=reference_number', 'consultant__username', 'manager__username'
     ]
+    search_help_text = 'Reference number (exact) or username. Prefix with "notes:" to search notes.'
+    raw_id_fields = ['consultant', 'manager', 'parent_commission', 'adjustment_for']
     readonly_fields = [
         'created_at', 'updated_at', 'created_by',
         'approved_by', 'approved_at', 'paid_at'
@@ -52,7 +58,23 @@ class CommissionAdmin(admin.ModelAdmin):
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
     
+    def get_search_results(self, request, queryset, search_term):
+        if search_term.startswith(NOTES_SEARCH_PREFIX):
+            term = search_term[len(NOTES_SEARCH_PREFIX):].strip()
+            return queryset.filter(notes__icontains=term), False
+        return super().get_search_results(request, queryset, search_term)
+    
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related(
-            'consultant', 'manager', 'created_by', 'approved_by'
+        # Usernames come back as columns, so list rows don't build User objects
+        return super().get_queryset(request).annotate(
+            consultant_username=F('consultant__username'),
+            manager_username=F('manager__username'),
         )
+    
+    @admin.display(description='Consultant', ordering='consultant_username')
+    def consultant_username(self, obj):
+        return obj.consultant_username
+    
+    @admin.display(description='Manager', ordering='manager_username')
+    def manager_username(self, obj):
+        return obj.manager_username
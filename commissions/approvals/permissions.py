@@ -0,0 +1,19 @@
+"""
+Permission helpers for the approval workflow.
+"""
+
+ADMIN_GROUP_NAME = 'Admins'
+
+
+def is_admin_user(user):
+    """
+    Whether the user may act as an approval admin (staff or 'Admins' group).
+    
+    The result is memoized on the user instance, so repeated checks within a
+    request (e.g. service calls made by a view) cost at most one query.
+    """
+    cached = getattr(user, '_is_admin_cached', None)
+    if cached is None:
+        cached = user.is_staff or user.groups.filter(name=ADMIN_GROUP_NAME).exists()
+        user._is_admin_cached = cached
+    return cached
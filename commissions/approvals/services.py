@@ -1,7 +1,12 @@
 from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from commissions.models import Commission, CommissionApproval, ApprovalHistory
+from commissions.approvals.permissions import is_admin_user
+from hierarchy.models import ReportingLine
+from notifications.models import EventType
+from commissions.approvals.tasks import enqueue_notifications
 
 class ApprovalError(ValidationError):
     """Base error for approval workflow issues"""
@@ -15,47 +20,86 @@ class ApprovalStateService:
     """
     
     VALID_TRANSITIONS = {
-        'draft': ['submitted'],
-        'submitted': ['approved', 'rejected'],
-        'approved': ['paid'],
-        'rejected': ['submitted'],  # Can resubmit from rejected (moves back to submitted)
+        'draft': frozenset({'submitted'}),
+        'submitted': frozenset({'approved', 'rejected'}),
+        'approved': frozenset({'paid'}),
+        'rejected': frozenset({'submitted'}),  # Can resubmit from rejected (moves back to submitted)
     }
 
     @staticmethod
     def validate_transition(commission, target_state):
         current_state = commission.state
-        allowed = ApprovalStateService.VALID_TRANSITIONS.get(current_state, [])
+        allowed = ApprovalStateService.VALID_TRANSITIONS.get(current_state, frozenset())
         if target_state not in allowed:
             raise ApprovalError(
                 f"Invalid transition from '{current_state}' to '{target_state}'."
             )
 
+    @staticmethod
+    def get_approval_record(commission):
+        """
+        Approval record of a commission.
+        
+        Records are created alongside commissions (see commissions.signals), so this
+        is normally served from the relation cache; get_or_create covers older rows.
+        """
+        try:
+            return commission.approval
+        except CommissionApproval.DoesNotExist:
+            approval_record, created = CommissionApproval.objects.get_or_create(
+                commission=commission
+            )
+            return approval_record
+
     @staticmethod
     @transaction.atomic
     def record_action(commission, action, actor, to_state, notes=""):
         """
         Atomically updates commission state and writes into approval history.
         """
+        return ApprovalStateService._write_action(commission, action, actor, to_state, notes)
+
+    @staticmethod
+    def _write_action(commission, action, actor, to_state, notes=""):
+        """
+        record_action without its own transaction.
+        
+        For the workflow services, which are atomic already; a nested block
+        would only add a SAVEPOINT/RELEASE pair per action.
+        """
         from_state = commission.state
+        now = timezone.now()
         
         # 1. Update Commission record
-        commission.state = to_state
+        updates = {'state': to_state, 'updated_at': now}
         
         # Special case: if approving, also set approved_by/at on Commission for backward compatibility
         if to_state == 'approved':
-            commission.approved_by = actor
-            commission.approved_at = timezone.now()
+            updates['approved_by'] = actor
+            updates['approved_at'] = now
         
         # Special case: if paying, also set paid_at
         if to_state == 'paid':
-            commission.paid_at = timezone.now()
-            
-        commission.save()
+            updates['paid_at'] = now
+        
+        # Single compare-and-set UPDATE: it only applies while the row is still in
+        # the state this action was validated against (a concurrent action that got
+        # there first matches nothing), and paid commissions are immutable
+        updated = Commission.objects.filter(
+            pk=commission.pk, state=from_state
+        ).exclude(state='paid').update(**updates)
+        if not updated:
+            current_state = Commission.objects.filter(pk=commission.pk).values_list('state', flat=True).first()
+            if current_state == 'paid':
+                raise ApprovalError("Cannot modify a commission that has been paid.")
+            raise ApprovalError(
+                f"Invalid transition from '{current_state}' to '{to_state}'."
+            )
+        for field, value in updates.items():
+            setattr(commission, field, value)
         
         # 2. Ensure Approval process record exists
-        approval_record, created = CommissionApproval.objects.get_or_create(
-            commission=commission
-        )
+        approval_record = ApprovalStateService.get_approval_record(commission)
         
         # 3. Write History Entry
         history_entry = ApprovalHistory.objects.create(
@@ -78,9 +122,7 @@ class ApprovalSubmissionService:
     def submit(commission, actor, notes=""):
         ApprovalStateService.validate_transition(commission, 'submitted')
         
-        approval_record, created = CommissionApproval.objects.get_or_create(
-            commission=commission
-        )
+        approval_record = ApprovalStateService.get_approval_record(commission)
         
         # Lock in the approver at time of submission
         # For base commissions, it uses the manager identified in Phase 1 (if any)
@@ -88,14 +130,11 @@ class ApprovalSubmissionService:
         if not approval_record.assigned_approver:
             approval_record.assigned_approver = commission.manager
             approval_record.assigned_role = 'MANAGER'
-            approval_record.save()
+            approval_record.save(update_fields=['assigned_approver', 'assigned_role', 'updated_at'])
             
         # Notify Approver
         if approval_record.assigned_approver:
-            from notifications.services import NotificationService
-            from notifications.models import EventType
-            
-            NotificationService.send(
+            enqueue_notifications([dict(
                 event_type=EventType.COMM_001,
                 recipient=approval_record.assigned_approver,
                 source_model='Commission',
@@ -105,9 +144,9 @@ class ApprovalSubmissionService:
                     'amount': str(commission.calculated_amount),
                     'consultant': commission.consultant.username
                 }
-            )
+            )])
 
-        return ApprovalStateService.record_action(
+        return ApprovalStateService._write_action(
             commission, 'SUBMIT', actor, 'submitted', notes
         )
 
@@ -115,58 +154,137 @@ class ApprovalSubmissionService:
 class ApprovalDecisionService:
     """Handles 'APPROVE' or 'REJECT' actions (Submitted -> Approved/Rejected)"""
     
+    @staticmethod
+    def _get_permissions(commission, actor):
+        """
+        Work out how the actor relates to the commission.
+        
+        Checks run cheapest first and stop at the first match: the explicit
+        manager (no query), admin (memoized), then a single query answering
+        the hierarchy and assigned-approver checks.
+        """
+        perms = {
+            'is_explicit_manager': commission.manager_id == actor.id,
+            'is_admin': False,
+            'is_hierarchy_manager': False,
+            'is_assigned_approver': False,
+        }
+        if perms['is_explicit_manager']:
+            return perms
+        
+        perms['is_admin'] = is_admin_user(actor)
+        if perms['is_admin']:
+            return perms
+        
+        authz = Commission.objects.filter(pk=commission.pk).annotate(
+            is_hierarchy_manager=Exists(ReportingLine.objects.filter(
+                manager=actor,
+                consultant=OuterRef('consultant'),
+                is_active=True
+            )),
+            is_assigned_approver=Exists(CommissionApproval.objects.filter(
+                commission=OuterRef('pk'),
+                assigned_approver=actor
+            )),
+        ).values('is_hierarchy_manager', 'is_assigned_approver').first()
+        perms.update(authz or {})
+        return perms
+    
     @staticmethod
     @transaction.atomic
     def approve(commission, actor, notes=""):
         ApprovalStateService.validate_transition(commission, 'approved')
         
         # Security: Only assigned approver, Manager (Hierarchy), or Admin can approve
-        approval_record = getattr(commission, 'approval', None)
-        is_admin = actor.is_staff or actor.groups.filter(name='Admins').exists()
+        perms = ApprovalDecisionService._get_permissions(commission, actor)
         
-        # Check hierarchy permission
-        from hierarchy.models import ReportingLine
-        is_hierarchy_manager = ReportingLine.objects.filter(
-            manager=actor, 
-            consultant=commission.consultant,
-            is_active=True
-        ).exists()
-        
-        is_explicit_manager = commission.manager == actor
-        
-        if not is_admin and not is_hierarchy_manager and not is_explicit_manager and (not approval_record or approval_record.assigned_approver != actor):
-            raise ApprovalError(f"Auth Denied. Admin:{is_admin}, Hier:{is_hierarchy_manager}, Expl:{is_explicit_manager}, Actor:{actor.username}, Cons:{commission.consultant.username}")
+        if not any(perms.values()):
+            raise ApprovalError(f"Auth Denied. Admin:{perms['is_admin']}, Hier:{perms['is_hierarchy_manager']}, Expl:{perms['is_explicit_manager']}, Actor:{actor.username}, Cons:{commission.consultant.username}")
             
-        history = ApprovalStateService.record_action(
+        history = ApprovalStateService._write_action(
             commission, 'APPROVE', actor, 'approved', notes
         )
         
         # CASCADE: If this is a base commission, automatically approve linked overrides
+        approved = [commission]
         if commission.commission_type == 'base':
-             overrides = Commission.objects.filter(
-                 parent_commission=commission, 
-                 state='submitted' # Only auto-approve if they were submitted
-             )
-             for ovr in overrides:
-                 ApprovalDecisionService.approve(ovr, actor, f"Auto-approved via base {commission.reference_number}")
-
-        # Notify Consultant
-        from notifications.services import NotificationService
-        from notifications.models import EventType
-        
-        NotificationService.send(
-            event_type=EventType.COMM_002,
-            recipient=commission.consultant,
-            source_model='Commission',
-            source_id=commission.id,
-            metadata={
-                'reference': commission.reference_number,
-                'status': 'Approved'
-            }
-        )
+            approved += ApprovalDecisionService._cascade_approve(commission, actor)
+
+        # Notify Consultant (sent after commit, off the request thread)
+        enqueue_notifications([
+            dict(
+                event_type=EventType.COMM_002,
+                recipient=commission.consultant,
+                source_model='Commission',
+                source_id=approved_commission.id,
+                metadata={
+                    'reference': approved_commission.reference_number,
+                    'status': 'Approved'
+                }
+            )
+            for approved_commission in approved
+        ])
                  
         return history
 
+    @staticmethod
+    def _cascade_approve(base, actor):
+        """
+        Approve the submitted overrides of a base commission in bulk.
+        
+        Overrides share the base's consultant, so the actor's authorisation for
+        the base covers them; permission checks are not repeated per override.
+        """
+        # Lock the overrides so their state cannot change between this read and the UPDATE;
+        # their approval ids come along in the same query
+        overrides = list(
+            Commission.objects.select_for_update(of=('self',)).filter(
+                parent_commission=base,
+                state='submitted'  # Only auto-approve if they were submitted
+            ).select_related('approval').only('id', 'reference_number', 'approval__id')
+        )
+        if not overrides:
+            return []
+        
+        override_ids = [ovr.id for ovr in overrides]
+        now = timezone.now()
+        Commission.objects.filter(id__in=override_ids).update(
+            state='approved', approved_by=actor, approved_at=now, updated_at=now
+        )
+        
+        approval_ids = {}
+        missing = []
+        for ovr in overrides:
+            try:
+                approval_ids[ovr.id] = ovr.approval.id
+            except CommissionApproval.DoesNotExist:
+                missing.append(ovr.id)
+        if missing:
+            # Older rows without an approval record (a concurrent creation is skipped by the unique constraint)
+            CommissionApproval.objects.bulk_create(
+                [CommissionApproval(commission_id=ovr_id) for ovr_id in missing],
+                ignore_conflicts=True
+            )
+            approval_ids.update(
+                CommissionApproval.objects.filter(commission_id__in=missing)
+                .values_list('commission_id', 'id')
+            )
+        
+        # One INSERT for the whole fan-out
+        ApprovalHistory.objects.bulk_create([
+            ApprovalHistory(
+                approval_record_id=approval_ids[ovr.id],
+                action='APPROVE',
+                actor=actor,
+                from_state='submitted',
+                to_state='approved',
+                notes=f"Auto-approved via base {base.reference_number}"
+            )
+            for ovr in overrides
+        ])
+        
+        return overrides
+
     @staticmethod
     @transaction.atomic
     def reject(commission, actor, rejection_reason):
@@ -176,27 +294,13 @@ class ApprovalDecisionService:
         ApprovalStateService.validate_transition(commission, 'rejected')
         
         # Security: Only assigned approver, Manager, or Admin can reject
-        approval_record = getattr(commission, 'approval', None)
-        is_admin = actor.is_staff or actor.groups.filter(name='Admins').exists()
-        
-        # Check hierarchy permission
-        from hierarchy.models import ReportingLine
-        is_hierarchy_manager = ReportingLine.objects.filter(
-            manager=actor, 
-            consultant=commission.consultant,
-            is_active=True
-        ).exists()
+        perms = ApprovalDecisionService._get_permissions(commission, actor)
         
-        is_explicit_manager = commission.manager == actor
-        
-        if not is_admin and not is_hierarchy_manager and not is_explicit_manager and (not approval_record or approval_record.assigned_approver != actor):
+        if not any(perms.values()):
             raise ApprovalError("You are not authorized to reject this commission.")
             
-        # Notify Consultant
-        from notifications.services import NotificationService
-        from notifications.models import EventType
-        
-        NotificationService.send(
+        # Notify Consultant (sent after commit, so a failed rejection sends nothing)
+        enqueue_notifications([dict(
             event_type=EventType.COMM_003,
             recipient=commission.consultant,
             source_model='Commission',
@@ -206,9 +310,9 @@ class ApprovalDecisionService:
                 'status': 'Rejected',
                 'reason': rejection_reason
             }
-        )
+        )])
             
-        return ApprovalStateService.record_action(
+        return ApprovalStateService._write_action(
             commission, 'REJECT', actor, 'rejected', rejection_reason
         )
 
@@ -220,11 +324,11 @@ class ApprovalPaymentService:
     @transaction.atomic
     def mark_as_paid(commission, actor, notes=""):
         # Security: Only Admins can mark as paid
-        if not (actor.is_staff or actor.groups.filter(name='Admins').exists()):
+        if not is_admin_user(actor):
             raise ApprovalError("Only Admins or Finance roles can mark commissions as paid.")
             
         ApprovalStateService.validate_transition(commission, 'paid')
         
-        return ApprovalStateService.record_action(
+        return ApprovalStateService._write_action(
             commission, 'PAID', actor, 'paid', notes
         )
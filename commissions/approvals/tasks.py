@@ -0,0 +1,31 @@
+"""
+Approval Side Effects
+Sends workflow notifications once the approval transaction has committed.
+The project has no durable task queue, so notifications are sent in the
+on_commit callback itself rather than handed to an in-process pool that
+would drop them when the instance recycles; the audit history stays in the
+transaction with the state change.
+"""
+import logging
+
+from django.db import transaction
+
+from notifications.services import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+def send_notifications(notifications: list):
+    """Send each notification (NotificationService.send keyword arguments)."""
+    for kwargs in notifications:
+        try:
+            NotificationService.send(**kwargs)
+        except Exception as e:
+            logger.error(f"Approval notification {kwargs.get('event_type')} for {kwargs.get('source_id')} failed: {e}")
+
+
+def enqueue_notifications(notifications: list):
+    """Send notifications only if, and once, the surrounding transaction commits."""
+    if not notifications:
+        return
+    transaction.on_commit(lambda: send_notifications(notifications))
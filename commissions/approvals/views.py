@@ -1,7 +1,12 @@
+import hashlib
+
 from rest_framework import views, status, permissions
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.core.cache import cache
+from django.db.models import Count, Max, Prefetch, Q
 from commissions.models import Commission, CommissionApproval, ApprovalHistory
 from commissions.serializers import (
     CommissionReadSerializer,
@@ -17,13 +22,48 @@ from commissions.approvals.services import (
     ApprovalPaymentService,
     ApprovalError
 )
+from commissions.approvals.permissions import is_admin_user
+from hierarchy.models import ReportingLine
+
+# Columns rendered by ApprovalHistorySerializer (actor via UserBasicSerializer)
+TIMELINE_ONLY_FIELDS = (
+    'id', 'approval_record', 'action', 'from_state', 'to_state', 'notes', 'timestamp', 'actor',
+    'actor__id', 'actor__username', 'actor__email', 'actor__first_name', 'actor__last_name',
+)
+
+
+# Upper bound on staleness for changes the freshness key cannot see
+# (e.g. reporting-line edits that change a manager's team)
+PENDING_CACHE_TTL = 60
+
+
+def build_pending_cache_key(user_id, status_param, query_params, latest, approval_latest, total):
+    """Cache key for one page of a user's pending approvals listing."""
+    raw = ':'.join([
+        status_param,
+        query_params.get('page', '1'),
+        query_params.get('page_size', ''),
+        query_params.get('fields', ''),
+        latest.isoformat() if latest else '',
+        approval_latest.isoformat() if approval_latest else '',
+        str(total),
+    ])
+    return f"commissions:pending:{user_id}:{hashlib.md5(raw.encode()).hexdigest()}"
+
+
+class PendingApprovalsPagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
 
 class PendingApprovalsListView(views.APIView):
     """
     GET /api/commissions/approvals/pending/
-    Returns commissions pending approval for the current user (Manager/Admin).
+    Returns commissions pending approval for the current user (Manager/Admin), paginated.
     """
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PendingApprovalsPagination
 
     def get(self, request):
         user = request.user
@@ -32,37 +72,53 @@ class PendingApprovalsListView(views.APIView):
         status_param = request.query_params.get('status', 'submitted')
         
         # 1. Base Queryset Construction
-        if user.is_staff or user.groups.filter(name='Admins').exists():
+        if is_admin_user(user):
             # Admins see everything (filtered below)
             queryset = Commission.objects.all()
         else:
             # Managers see what is assigned to them OR what belongs to their team
-            from django.db.models import Q
-            from hierarchy.models import ReportingLine
-            
             # A. Direct assignments via Approval record
             filter_q = Q(approval__assigned_approver=user)
             
-            # B. Team members (fallback based on hierarchy)
+            # B. Team members (fallback based on hierarchy), as a subquery
             team_member_ids = ReportingLine.objects.filter(
                 manager=user, 
                 is_active=True
-            ).values_list('consultant_id', flat=True)
-            
-            if team_member_ids:
-                filter_q |= Q(consultant_id__in=team_member_ids)
+            ).values('consultant_id')
+            filter_q |= Q(consultant_id__in=team_member_ids)
                 
             # C. Also include commissions where user is explicitly set as 'manager' field
             filter_q |= Q(manager=user)
             
-            queryset = Commission.objects.filter(filter_q).distinct()
+            # No DISTINCT needed: the approval join is one-to-one and the other
+            # clauses are a subquery and a plain column, so rows cannot repeat
+            queryset = Commission.objects.filter(filter_q)
         
         # 2. Apply Status Filter
         if status_param != 'all':
             queryset = queryset.filter(state=status_param)
+        
+        # 3. Serve unchanged listings from cache. The key embeds the latest update
+        # time of the matching commissions and of their approval records (approver
+        # reassignment) plus the row count, so any transition, reassignment,
+        # addition or removal produces a new key without explicit invalidation.
+        freshness = queryset.aggregate(
+            latest=Max('updated_at'), approval_latest=Max('approval__updated_at'), total=Count('id')
+        )
+        cache_key = build_pending_cache_key(user.id, status_param, request.query_params, **freshness)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return Response(cached)
+        
+        # 4. Load everything CommissionReadSerializer touches up front (avoids per-row queries)
+        queryset = CommissionReadSerializer.prefetch_queryset(queryset)
             
-        serializer = CommissionReadSerializer(queryset, many=True)
-        return Response(serializer.data)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = CommissionReadSerializer(page, many=True, context={'request': request})
+        response = paginator.get_paginated_response(serializer.data)
+        cache.set(cache_key, response.data, PENDING_CACHE_TTL)
+        return response
 
 
 class CommissionApprovalDetailView(views.APIView):
@@ -73,14 +129,22 @@ class CommissionApprovalDetailView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
-        commission = get_object_or_404(Commission, pk=pk)
+        # Approval, approver and history (with actors) in one join + one prefetch
+        commission = get_object_or_404(
+            Commission.objects.select_related(
+                'approval', 'approval__assigned_approver'
+            ).prefetch_related(
+                Prefetch('approval__history', queryset=ApprovalHistory.objects.select_related('actor'))
+            ),
+            pk=pk
+        )
         
-        # Security: Owner, Assigned Approver, or Admin
-        is_owner = commission.consultant == request.user
-        is_approver = hasattr(commission, 'approval') and commission.approval.assigned_approver == request.user
-        is_admin = request.user.is_staff or request.user.groups.filter(name='Admins').exists()
+        # Security: Owner, Assigned Approver, or Admin (admin check only if needed)
+        approval = getattr(commission, 'approval', None)
+        is_owner = commission.consultant_id == request.user.id
+        is_approver = approval is not None and approval.assigned_approver_id == request.user.id
         
-        if not (is_owner or is_approver or is_admin):
+        if not (is_owner or is_approver or is_admin_user(request.user)):
             return Response({"detail": "Not authorized to view this approval."}, status=status.HTTP_403_FORBIDDEN)
             
         try:
@@ -98,10 +162,10 @@ class CommissionSubmitView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        commission = get_object_or_404(Commission, pk=pk)
+        commission = get_object_or_404(Commission.objects.select_related('approval'), pk=pk)
         
         # Security: Only owner or Admin
-        if commission.consultant != request.user and not request.user.is_staff:
+        if commission.consultant_id != request.user.id and not request.user.is_staff:
              return Response({"detail": "Only the consultant can submit this commission."}, status=status.HTTP_403_FORBIDDEN)
              
         serializer = ApprovalActionBaseSerializer(data=request.data)
@@ -126,7 +190,7 @@ class CommissionApproveView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        commission = get_object_or_404(Commission, pk=pk)
+        commission = get_object_or_404(Commission.objects.select_related('approval'), pk=pk)
         
         serializer = ApprovalActionBaseSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -150,7 +214,7 @@ class CommissionRejectView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        commission = get_object_or_404(Commission, pk=pk)
+        commission = get_object_or_404(Commission.objects.select_related('approval'), pk=pk)
         
         serializer = ApprovalRejectSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -174,7 +238,7 @@ class CommissionPayView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        commission = get_object_or_404(Commission, pk=pk)
+        commission = get_object_or_404(Commission.objects.select_related('approval'), pk=pk)
         
         serializer = ApprovalPaySerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -198,19 +262,20 @@ class CommissionTimelineView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, pk):
-        commission = get_object_or_404(Commission, pk=pk)
+        commission = get_object_or_404(Commission.objects.select_related('approval'), pk=pk)
         
         # Security: Owner, Manager, or Admin
-        is_owner = commission.consultant == request.user
-        is_manager = commission.manager == request.user
-        is_admin = request.user.is_staff or request.user.groups.filter(name='Admins').exists()
+        is_owner = commission.consultant_id == request.user.id
+        is_manager = commission.manager_id == request.user.id
         
-        if not (is_owner or is_manager or is_admin):
+        if not (is_owner or is_manager or is_admin_user(request.user)):
             return Response({"detail": "Not authorized to view timeline."}, status=status.HTTP_403_FORBIDDEN)
             
         try:
-            history = commission.approval.history.all().order_by('timestamp')
-            serializer = ApprovalHistorySerializer(history, many=True)
+            history = commission.approval.history.select_related('actor').only(
+                *TIMELINE_ONLY_FIELDS
+            ).order_by('timestamp')
+            serializer = ApprovalHistorySerializer(history.iterator(chunk_size=500), many=True)
             return Response(serializer.data)
         except (CommissionApproval.DoesNotExist, AttributeError):
             return Response([], status=status.HTTP_200_OK)
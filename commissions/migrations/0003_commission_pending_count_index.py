@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commissions', '0002_commission_client_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['state', 'consultant', 'calculated_amount'], name='commissions_state_494020_idx'),
+        ),
+    ]
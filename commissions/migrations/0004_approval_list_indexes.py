@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-16 19:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commissions', '0003_commission_pending_count_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='approvalhistory',
+            index=models.Index(fields=['approval_record', 'timestamp'], name='capp_hist_record_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commissionapproval',
+            index=models.Index(fields=['assigned_approver', 'commission'], name='capp_approver_comm_idx'),
+        ),
+    ]
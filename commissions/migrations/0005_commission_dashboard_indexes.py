@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commissions', '0004_approval_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['consultant', 'commission_type', 'transaction_date', 'state', 'calculated_amount', 'sale_amount'], name='comm_consultant_dash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commission',
+            index=models.Index(fields=['manager', 'commission_type', 'transaction_date', 'state', 'calculated_amount'], name='comm_manager_dash_idx'),
+        ),
+    ]
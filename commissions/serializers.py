@@ -1,18 +1,64 @@
 from rest_framework import serializers
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.contrib.auth import get_user_model
+from django.db.models import F, Prefetch, Value
+from django.db.models.functions import Coalesce, NullIf
 from decimal import Decimal
 from .models import Commission, CommissionApproval, ApprovalHistory
-from .services import CommissionCalculationService
+from .services import CommissionCalculationService, StateTransitionService, DUPLICATE_REFERENCE_MESSAGE
 
 User = get_user_model()
 
 
+# Client name shown for a commission: its own, else the parent's (overrides),
+# else the reference number. Annotated as client_name_resolved by the
+# serializers' prefetch_queryset, which every queryset they render must go through.
+CLIENT_NAME_RESOLVED = Coalesce(
+    NullIf(F('client_name'), Value('')),
+    NullIf(F('parent_commission__client_name'), Value('')),
+    F('reference_number'),
+)
+
+
+# Allowed difference between a client-sent calculated_amount and ours (rounding)
+CALCULATED_AMOUNT_TOLERANCE = Decimal('0.01')
+
+# History entries embedded per commission in read/list responses; the full
+# trail is served by the approval detail and timeline endpoints
+NESTED_HISTORY_LIMIT = 5
+
+
 class UserBasicSerializer(serializers.ModelSerializer):
     """Minimal user representation for commission responses"""
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
         read_only_fields = fields
+    
+    def to_representation(self, instance):
+        # The same few users repeat across every row of a list response;
+        # serialize each once per root serializer (its context is per-request)
+        user_cache = self.context.setdefault('_user_cache', {})
+        data = user_cache.get(instance.pk)
+        if data is None:
+            data = user_cache[instance.pk] = super().to_representation(instance)
+        return data
+
+
+class MinimalUsersMixin:
+    """
+    Render nested users as plain usernames when the request asks for
+    ?fields=minimal (needs the request in the serializer context).
+    """
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is not None and request.query_params.get('fields') == 'minimal':
+            for name, field in fields.items():
+                if isinstance(field, UserBasicSerializer):
+                    fields[name] = serializers.SlugRelatedField(slug_field='username', read_only=True)
+        return fields
 
 
 class CommissionCreateSerializer(serializers.ModelSerializer):
@@ -37,6 +83,27 @@ class CommissionCreateSerializer(serializers.ModelSerializer):
             'reference_number',
             'notes',
         ]
+        # Field checks run as DRF validators instead of per-field validate_* methods
+        extra_kwargs = {
+            'sale_amount': {'validators': [
+                MinValueValidator(Decimal('0.01'), message="Sale amount must be greater than 0."),
+            ]},
+            'gst_rate': {'validators': [
+                MinValueValidator(0, message="GST rate must be between 0 and 100."),
+                MaxValueValidator(100, message="GST rate must be between 0 and 100."),
+            ]},
+            'commission_rate': {'validators': [
+                MinValueValidator(Decimal('0.01'), message="Commission rate must be between 0 and 100."),
+                MaxValueValidator(100, message="Commission rate must be between 0 and 100."),
+            ]},
+            # Optional: the service always computes the stored amount server-side
+            'calculated_amount': {'required': False, 'validators': [
+                MinValueValidator(Decimal('0.01'), message="Calculated amount must be greater than 0."),
+            ]},
+            # Uniqueness is enforced by the insert itself (CommissionCreationService),
+            # so there is no racy pre-check query
+            'reference_number': {'validators': []},
+        }
     
     def validate_consultant_id(self, value):
         """Validate consultant exists"""
@@ -44,52 +111,21 @@ class CommissionCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(f"User with ID {value} not found.")
         return value
     
-    def validate_sale_amount(self, value):
-        """Validate sale amount is positive"""
-        if value <= 0:
-            raise serializers.ValidationError("Sale amount must be greater than 0.")
-        return value
-    
-    def validate_gst_rate(self, value):
-        """Validate GST rate is valid percentage"""
-        if value < 0 or value > 100:
-            raise serializers.ValidationError("GST rate must be between 0 and 100.")
-        return value
-    
-    def validate_commission_rate(self, value):
-        """Validate commission rate is valid percentage"""
-        if value <= 0 or value > 100:
-            raise serializers.ValidationError("Commission rate must be between 0 and 100.")
-        return value
-    
-    def validate_calculated_amount(self, value):
-        """Validate calculated amount is positive"""
-        if value <= 0:
-            raise serializers.ValidationError("Calculated amount must be greater than 0.")
-        return value
-    
-    def validate_reference_number(self, value):
-        """Validate reference number is unique"""
-        if Commission.objects.filter(reference_number=value).exists():
-            raise serializers.ValidationError({
-                "error": "duplicate_reference",
-                "detail": "A commission with this reference number already exists."
-            })
-        return value
-    
     def validate(self, attrs):
         """Cross-field validation"""
         sale_amount = attrs.get('sale_amount')
         commission_rate = attrs.get('commission_rate')
         calculated_amount = attrs.get('calculated_amount')
         
+        # Nothing to cross-check when the client leaves the amount to the server
+        if calculated_amount is None:
+            return attrs
+        
         # Sanity check: calculated amount should be reasonable
         expected_amount = CommissionCalculationService.calculate_base_commission(
             sale_amount, commission_rate, attrs.get('gst_rate', 0)
         )
-        tolerance = Decimal('0.01')  # Allow 1 cent difference for rounding
-        
-        if abs(calculated_amount - expected_amount) > tolerance:
+        if abs(calculated_amount - expected_amount) > CALCULATED_AMOUNT_TOLERANCE:
             raise serializers.ValidationError({
                 "calculated_amount": (
                     f"Calculated amount ({calculated_amount}) does not match "
@@ -101,15 +137,59 @@ class CommissionCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class BulkCommissionItemSerializer(CommissionCreateSerializer):
+    """
+    One row of a bulk payload.
+    
+    Consultants are checked for the whole batch by
+    BulkCommissionCreateSerializer instead of one query per row.
+    """
+    
+    def validate_consultant_id(self, value):
+        return value
+
+
 class BulkCommissionCreateSerializer(serializers.Serializer):
     """
     Serializer for bulk commission creation.
     Allows creating multiple commissions in one transaction.
     """
-    commissions = CommissionCreateSerializer(many=True)
+    commissions = BulkCommissionItemSerializer(many=True)
+    
+    def validate_commissions(self, value):
+        """
+        Reject unknown consultants and references that already exist or repeat
+        within the batch (one query each, errors reported per row).
+        """
+        consultant_ids = {item['consultant_id'] for item in value}
+        known_consultants = set(
+            User.objects.filter(id__in=consultant_ids).values_list('id', flat=True)
+        )
+        refs = [item['reference_number'] for item in value]
+        existing = set(
+            Commission.objects.filter(reference_number__in=refs)
+            .values_list('reference_number', flat=True)
+        )
+        seen = set()
+        errors = []
+        for item in value:
+            row_errors = {}
+            if item['consultant_id'] not in known_consultants:
+                row_errors['consultant_id'] = [f"User with ID {item['consultant_id']} not found."]
+            ref = item['reference_number']
+            if ref in existing:
+                row_errors['reference_number'] = [DUPLICATE_REFERENCE_MESSAGE]
+            elif ref in seen:
+                row_errors['reference_number'] = ["Duplicate reference number in this batch."]
+            seen.add(ref)
+            errors.append(row_errors)
+        
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return value
 
 
-class CommissionReadSerializer(serializers.ModelSerializer):
+class CommissionReadSerializer(MinimalUsersMixin, serializers.ModelSerializer):
     """
     Serializer for reading commission records.
     
@@ -121,21 +201,27 @@ class CommissionReadSerializer(serializers.ModelSerializer):
     created_by = UserBasicSerializer(read_only=True)
     approved_by = UserBasicSerializer(read_only=True)
     approval = serializers.SerializerMethodField()
-    client_name = serializers.SerializerMethodField()
+    client_name = serializers.CharField(source='client_name_resolved', read_only=True)
     
     def get_approval(self, obj):
-        try:
-            return CommissionApprovalSerializer(obj.approval).data
-        except (CommissionApproval.DoesNotExist, AttributeError):
-            return None
-
-    def get_client_name(self, obj):
-        # Fallback to parent commission client name if empty (for overrides)
-        if obj.client_name:
-            return obj.client_name
-        if obj.parent_commission and obj.parent_commission.client_name:
-            return obj.parent_commission.client_name
-        return obj.reference_number # Last resort fallback
+        # Missing relation raises a DoesNotExist that is also an AttributeError
+        approval = getattr(obj, 'approval', None)
+        return CommissionApprovalSummarySerializer(approval, context=self.context).data if approval else None
+    
+    @classmethod
+    def prefetch_queryset(cls, queryset):
+        """Load everything this serializer renders in a constant number of queries."""
+        return queryset.select_related(
+            'consultant', 'manager', 'created_by', 'approved_by',
+            'approval', 'approval__assigned_approver'
+        ).prefetch_related(
+            # Only the latest entries per approval (window-function slice, newest first)
+            Prefetch(
+                'approval__history',
+                queryset=ApprovalHistory.objects.select_related('actor').order_by('-timestamp')[:NESTED_HISTORY_LIMIT],
+                to_attr='recent_history'
+            )
+        ).annotate(client_name_resolved=CLIENT_NAME_RESOLVED)
     
     class Meta:
         model = Commission
@@ -168,7 +254,17 @@ class CommissionReadSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class CommissionListSerializer(serializers.ModelSerializer):
+_USER_COLUMNS = ('id', 'username', 'email', 'first_name', 'last_name')
+LIST_ONLY_FIELDS = (
+    'id', 'commission_type', 'consultant', 'manager', 'transaction_date',
+    'sale_amount', 'calculated_amount', 'state', 'reference_number',
+    'override_level', 'created_at',
+    *(f'consultant__{col}' for col in _USER_COLUMNS),
+    *(f'manager__{col}' for col in _USER_COLUMNS),
+)
+
+
+class CommissionListSerializer(MinimalUsersMixin, serializers.ModelSerializer):
     """
     Lighter serializer for list views.
     
@@ -176,14 +272,18 @@ class CommissionListSerializer(serializers.ModelSerializer):
     """
     consultant = UserBasicSerializer(read_only=True)
     manager = UserBasicSerializer(read_only=True)
-    client_name = serializers.SerializerMethodField()
+    client_name = serializers.CharField(source='client_name_resolved', read_only=True)
     
-    def get_client_name(self, obj):
-        if obj.client_name:
-            return obj.client_name
-        if obj.parent_commission and obj.parent_commission.client_name:
-            return obj.parent_commission.client_name
-        return obj.reference_number
+    @classmethod
+    def prefetch_queryset(cls, queryset):
+        """
+        Load only what this serializer renders: skips the text-heavy
+        notes/rejection_reason columns and unused audit FKs. client_name
+        and the parent FK are only read inside the COALESCE annotation.
+        """
+        return queryset.select_related(
+            'consultant', 'manager'
+        ).only(*LIST_ONLY_FIELDS).annotate(client_name_resolved=CLIENT_NAME_RESOLVED)
     
     class Meta:
         model = Commission
@@ -204,23 +304,6 @@ class CommissionListSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class CommissionSummarySerializer(serializers.Serializer):
-    """
-    Serializer for dashboard summary data.
-    
-    This is NOT a model serializer - it serializes aggregated data.
-    Used for endpoints like /api/commissions/summary/
-    """
-    period = serializers.DictField(child=serializers.DateField())
-    
-    base_commissions = serializers.DictField(child=serializers.DecimalField(max_digits=12, decimal_places=2))
-    override_commissions = serializers.DictField(child=serializers.DecimalField(max_digits=12, decimal_places=2))
-    
-    total_earnings = serializers.DecimalField(max_digits=12, decimal_places=2)
-    pending_approval = serializers.DecimalField(max_digits=12, decimal_places=2)
-    ready_for_payout = serializers.DecimalField(max_digits=12, decimal_places=2)
-
-
 class CommissionAdjustmentSerializer(serializers.Serializer):
     """
     Serializer for creating adjustment commissions.
@@ -232,8 +315,13 @@ class CommissionAdjustmentSerializer(serializers.Serializer):
         decimal_places=2,
         help_text="Adjustment amount (positive or negative)"
     )
+    # CharField trims whitespace before min_length runs, so padding doesn't count
     notes = serializers.CharField(
         required=True,
+        min_length=10,
+        error_messages={
+            'min_length': "Please provide a detailed reason for the adjustment (minimum 10 characters)."
+        },
         help_text="Reason for adjustment"
     )
     
@@ -243,14 +331,6 @@ class CommissionAdjustmentSerializer(serializers.Serializer):
             raise serializers.ValidationError("Adjustment amount cannot be zero.")
         return value
     
-    def validate_notes(self, value):
-        """Require meaningful notes for adjustments"""
-        if len(value.strip()) < 10:
-            raise serializers.ValidationError(
-                "Please provide a detailed reason for the adjustment (minimum 10 characters)."
-            )
-        return value
-    
     def validate(self, attrs):
         """Validate original commission can be adjusted"""
         # This will be called with the original commission instance passed via context
@@ -290,15 +370,6 @@ class StateTransitionSerializer(serializers.Serializer):
         help_text="Optional payment timestamp (for mark-paid)"
     )
     
-    # Valid state transitions
-    VALID_TRANSITIONS = {
-        'draft': ['submitted'],
-        'submitted': ['approved', 'rejected'],
-        'approved': ['paid'],
-        'rejected': ['draft'],
-        'paid': [],  # Final state
-    }
-    
     def validate(self, attrs):
         """Validate state transition is allowed"""
         commission = self.context.get('commission')
@@ -309,8 +380,8 @@ class StateTransitionSerializer(serializers.Serializer):
         
         current_state = commission.state
         
-        # Check if transition is valid
-        if target_state not in self.VALID_TRANSITIONS.get(current_state, []):
+        # Check if transition is valid (same state machine as the service)
+        if not StateTransitionService.can_transition(current_state, target_state):
             raise serializers.ValidationError({
                 "error": "invalid_transition",
                 "detail": f"Cannot transition from '{current_state}' to '{target_state}'."
@@ -328,7 +399,7 @@ class StateTransitionSerializer(serializers.Serializer):
         return value
 
 
-class ApprovalHistorySerializer(serializers.ModelSerializer):
+class ApprovalHistorySerializer(MinimalUsersMixin, serializers.ModelSerializer):
     """Serializer for chronological audit log entries"""
     actor = UserBasicSerializer(read_only=True)
     
@@ -338,7 +409,7 @@ class ApprovalHistorySerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class CommissionApprovalSerializer(serializers.ModelSerializer):
+class CommissionApprovalSerializer(MinimalUsersMixin, serializers.ModelSerializer):
     """Serializer for the overall approval workflow state"""
     assigned_approver = UserBasicSerializer(read_only=True)
     history = ApprovalHistorySerializer(many=True, read_only=True)
@@ -352,6 +423,15 @@ class CommissionApprovalSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
+class CommissionApprovalSummarySerializer(CommissionApprovalSerializer):
+    """Approval state with only the latest history entries (see CommissionReadSerializer.prefetch_queryset)"""
+    history = serializers.SerializerMethodField()
+    
+    def get_history(self, obj):
+        # recent_history is prefetched newest first; render chronologically
+        return ApprovalHistorySerializer(obj.recent_history[::-1], many=True, context=self.context).data
+
+
 class ApprovalActionBaseSerializer(serializers.Serializer):
     """Base for workflow action serializers"""
     notes = serializers.CharField(required=False, allow_blank=True)
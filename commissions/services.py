@@ -11,17 +11,63 @@ This layer handles:
 No API views or URL routing here - pure business logic.
 """
 
+import uuid
 from decimal import Decimal
-from django.db import transaction
+from functools import lru_cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from django.core.exceptions import ValidationError
-from datetime import datetime, timedelta
 
 from .models import Commission, CommissionApproval, ApprovalHistory
 from hierarchy.models import ReportingLine
 
 User = get_user_model()
 
+# Shared constants for the calculation hot path (bulk creation calls it per row)
+_ZERO = Decimal('0.00')
+_ONE = Decimal('1.0')
+_HUNDRED = Decimal('100.0')
+_CENT = Decimal('0.01')
+
+# Rows per INSERT statement for bulk writes
+BULK_BATCH_SIZE = 500
+
+DUPLICATE_REFERENCE_MESSAGE = "A commission with this reference number already exists."
+
+# Rows are written without full_clean(), so derived references are checked here
+REFERENCE_MAX_LENGTH = Commission._meta.get_field('reference_number').max_length
+
+
+def derived_reference(reference, suffix):
+    """
+    Reference of a row derived from another one (e.g. '<base>-OVR-L1').
+    
+    Raises ValidationError if it would not fit the reference_number column.
+    """
+    derived = f"{reference}{suffix}"
+    if len(derived) > REFERENCE_MAX_LENGTH:
+        raise ValidationError({'reference_number': [
+            f"Reference number is too long to derive '{suffix}' references "
+            f"(at most {REFERENCE_MAX_LENGTH - len(suffix)} characters)."
+        ]})
+    return derived
+
+
+@lru_cache(maxsize=32)
+def _gst_multiplier(gst_rate):
+    """1 + gst_rate/100; a handful of GST rates cover every sale."""
+    return _ONE + (gst_rate / _HUNDRED)
+
+
+def _to_decimal(value):
+    """Return value as a Decimal, skipping the str() round-trip when it already is one."""
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
 
 class CommissionCalculationService:
     """
@@ -43,23 +89,8 @@ class CommissionCalculationService:
         Returns:
             Decimal: Calculated commission amount
         """
-        # Convert to Decimal to ensure precision
-        sale_amount = Decimal(str(sale_amount))
-        commission_rate = Decimal(str(commission_rate))
-        gst_rate = Decimal(str(gst_rate))
-        
-        # If GST is included, remove it first
-        if gst_rate > 0:
-            gst_multiplier = Decimal('1.0') + (gst_rate / Decimal('100.0'))
-            base_amount = sale_amount / gst_multiplier
-        else:
-            base_amount = sale_amount
-        
-        # Calculate commission
-        commission = base_amount * (commission_rate / Decimal('100.0'))
-        
-        # Round to 2 decimal places
-        return commission.quantize(Decimal('0.01'))
+        base_amount = CommissionCalculationService.net_sale_amount(sale_amount, gst_rate)
+        return CommissionCalculationService.commission_on_net(base_amount, commission_rate)
     
     @staticmethod
     def calculate_override_commission(sale_amount, override_rate, gst_rate=0):
@@ -71,6 +102,30 @@ class CommissionCalculationService:
         return CommissionCalculationService.calculate_base_commission(
             sale_amount, override_rate, gst_rate
         )
+    
+    @staticmethod
+    def net_sale_amount(sale_amount, gst_rate=0):
+        """
+        Sale amount with GST removed (unrounded).
+        
+        Base and override commissions of one sale share this value, so callers
+        creating several of them compute it once.
+        """
+        sale_amount = _to_decimal(sale_amount)
+        gst_rate = _to_decimal(gst_rate)
+        
+        # If GST is included, remove it first
+        if gst_rate > 0:
+            return sale_amount / _gst_multiplier(gst_rate)
+        return sale_amount
+    
+    @staticmethod
+    def commission_on_net(base_amount, commission_rate):
+        """Commission at commission_rate percent of a net sale amount, rounded to cents."""
+        commission = base_amount * (_to_decimal(commission_rate) / _HUNDRED)
+        
+        # Round to 2 decimal places
+        return commission.quantize(_CENT)
 
 
 class OverrideResolutionService:
@@ -128,28 +183,64 @@ class OverrideResolutionService:
         if max_levels is None:
             max_levels = cls.MAX_OVERRIDE_LEVELS
         
-        override_chain = []
-        current_user = consultant
+        if max_levels < 1:
+            return []
+        
+        # Walk every level and load the managers in one round trip
+        table = connection.ops.quote_name(ReportingLine._meta.db_table)
+        user_table = connection.ops.quote_name(User._meta.db_table)
+        sql = f"""
+            WITH RECURSIVE chain (consultant_id, manager_id, start_date, lvl) AS (
+                SELECT consultant_id, manager_id, start_date, 1
+                FROM {table}
+                WHERE consultant_id = %s
+                  AND start_date <= %s
+                  AND (end_date IS NULL OR end_date >= %s)
+                UNION ALL
+                SELECT rl.consultant_id, rl.manager_id, rl.start_date, chain.lvl + 1
+                FROM {table} rl
+                JOIN chain ON rl.consultant_id = chain.manager_id
+                WHERE chain.lvl < %s
+                  AND rl.start_date <= %s
+                  AND (rl.end_date IS NULL OR rl.end_date >= %s)
+            )
+            SELECT u.*, chain.consultant_id AS chain_consultant_id, chain.lvl AS chain_level
+            FROM chain
+            JOIN {user_table} u ON u.id = chain.manager_id
+            ORDER BY chain.lvl, chain.start_date DESC
+        """
+        params = [
+            consultant.pk, transaction_date, transaction_date,
+            max_levels, transaction_date, transaction_date,
+        ]
+        
+        # Historical lines can overlap a date; like get_manager_at_date, the
+        # most recently started line wins at each level
+        managers_by_level = {}
+        for manager in User.objects.raw(sql, params):
+            managers_by_level.setdefault((manager.chain_consultant_id, manager.chain_level), manager)
         
+        override_chain = []
+        current_id = consultant.pk
         for level in range(1, max_levels + 1):
-            manager = cls.get_manager_at_date(current_user, transaction_date)
+            manager = managers_by_level.get((current_id, level))
             
-            if not manager:
+            if manager is None:
                 break
             
             # Prevent circular references
-            if manager == consultant:
+            if manager.pk == consultant.pk:
                 break
             
             override_chain.append((manager, level))
-            current_user = manager
+            current_id = manager.pk
         
         return override_chain
     
     @classmethod
     def get_override_rate(cls, level):
         """Get the override rate for a specific level"""
-        return cls.DEFAULT_OVERRIDE_RATES.get(level, Decimal('0.00'))
+        return cls.DEFAULT_OVERRIDE_RATES.get(level, _ZERO)
 
 
 class CommissionCreationService:
@@ -160,7 +251,6 @@ class CommissionCreationService:
     """
     
     @staticmethod
-    @transaction.atomic
     def create_base_commission_with_overrides(
         consultant,
         transaction_date,
@@ -170,102 +260,170 @@ class CommissionCreationService:
         reference_number,
         notes='',
         created_by=None,
-        client_name=''
+        client_name='',
+        chain_cache=None
     ):
         """
         Create base commission and automatically create override commissions.
-        """
-        # Calculate base commission amount
-        calculated_amount = CommissionCalculationService.calculate_base_commission(
-            sale_amount, commission_rate, gst_rate
-        )
         
-        # Create base commission
-        desc_consultant = consultant # store for history
-        base_commission = Commission.objects.create(
-            commission_type='base',
-            consultant=consultant,
-            manager=None,  # Base commissions have no manager
-            transaction_date=transaction_date,
-            sale_amount=sale_amount,
-            gst_rate=gst_rate,
-            commission_rate=commission_rate,
-            calculated_amount=calculated_amount,
-            state='submitted',
-            reference_number=reference_number,
-            notes=notes,
+        chain_cache: optional dict shared across calls in one request;
+        override chains are memoized in it per (consultant, transaction date).
+        """
+        return CommissionCreationService.create_many_with_overrides(
+            [{
+                'consultant': consultant,
+                'transaction_date': transaction_date,
+                'sale_amount': sale_amount,
+                'gst_rate': gst_rate,
+                'commission_rate': commission_rate,
+                'reference_number': reference_number,
+                'notes': notes,
+                'client_name': client_name,
+            }],
             created_by=created_by,
-            client_name=client_name
-        )
+            chain_cache=chain_cache
+        )[0]
+    
+    @staticmethod
+    @transaction.atomic
+    def create_many_with_overrides(rows, created_by=None, chain_cache=None):
+        """
+        Create base commissions with their override commissions for many sales at once.
         
-        # Resolve override chain
-        override_chain = OverrideResolutionService.resolve_override_chain(
-            consultant, transaction_date
-        )
+        rows: dicts with consultant, transaction_date, sale_amount, gst_rate,
+        commission_rate and reference_number (notes and client_name optional).
+        Every table is written with multi-row INSERTs whatever the number of
+        rows, and override chains are resolved once per (consultant, date).
         
-        # Create override commissions
-        override_commissions = []
-        for manager, level in override_chain:
-            override_rate = OverrideResolutionService.get_override_rate(level)
-            override_amount = CommissionCalculationService.calculate_override_commission(
-                sale_amount, override_rate, gst_rate
+        Returns one result dict per row, in order.
+        """
+        if chain_cache is None:
+            chain_cache = {}
+        
+        # Create base commissions (bulk_create skips the post_save signal;
+        # their approval records are written below with the overrides')
+        base_commissions = []
+        override_chains = []
+        net_amounts = []
+        for row in rows:
+            consultant = row['consultant']
+            transaction_date = row['transaction_date']
+            
+            # Calculate base commission amount (the net amount is reused for overrides)
+            net_amount = CommissionCalculationService.net_sale_amount(row['sale_amount'], row['gst_rate'])
+            calculated_amount = CommissionCalculationService.commission_on_net(
+                net_amount, row['commission_rate']
             )
             
-            override_commission = Commission.objects.create(
-                commission_type='override',
+            # Resolve override chain (once per consultant/date)
+            chain_key = (consultant.pk, transaction_date)
+            if chain_key not in chain_cache:
+                chain_cache[chain_key] = OverrideResolutionService.resolve_override_chain(
+                    consultant, transaction_date
+                )
+            
+            base_commissions.append(Commission(
+                commission_type='base',
                 consultant=consultant,
-                manager=manager,  # Denormalized for immutability
+                manager=None,  # Base commissions have no manager
                 transaction_date=transaction_date,
-                sale_amount=sale_amount,
-                gst_rate=gst_rate,
-                commission_rate=override_rate,
-                calculated_amount=override_amount,
+                sale_amount=row['sale_amount'],
+                gst_rate=row['gst_rate'],
+                commission_rate=row['commission_rate'],
+                calculated_amount=calculated_amount,
                 state='submitted',
-                reference_number=f"{reference_number}-OVR-L{level}",
-                notes=f"Level {level} override for {consultant.username}",
-                override_level=level,
-                parent_commission=base_commission,
+                reference_number=row['reference_number'],
+                notes=row.get('notes', ''),
                 created_by=created_by,
-                client_name=client_name
-            )
-            override_commissions.append(override_commission)
-        
-        # Create Approval Record for Base Commission
-        # Assign to direct manager (first in chain) or Admin if no manager
-        direct_manager = override_chain[0][0] if override_chain else None
+                client_name=row.get('client_name', '')
+            ))
+            override_chains.append(chain_cache[chain_key])
+            net_amounts.append(net_amount)
+        
+        try:
+            Commission.objects.bulk_create(base_commissions, batch_size=BULK_BATCH_SIZE)
+        except IntegrityError:
+            # reference_number is the only constraint a new base row can break
+            raise ValidationError({'reference_number': [DUPLICATE_REFERENCE_MESSAGE]})
+        
+        # Create override commissions (they need the base PKs)
+        overrides_by_base = []
+        for base_commission, override_chain, net_amount in zip(base_commissions, override_chains, net_amounts):
+            override_commissions = []
+            for manager, level in override_chain:
+                override_rate = OverrideResolutionService.get_override_rate(level)
+                override_amount = CommissionCalculationService.commission_on_net(
+                    net_amount, override_rate
+                )
+                
+                override_commissions.append(Commission(
+                    commission_type='override',
+                    consultant=base_commission.consultant,
+                    manager=manager,  # Denormalized for immutability
+                    transaction_date=base_commission.transaction_date,
+                    sale_amount=base_commission.sale_amount,
+                    gst_rate=base_commission.gst_rate,
+                    commission_rate=override_rate,
+                    calculated_amount=override_amount,
+                    state='submitted',
+                    reference_number=derived_reference(base_commission.reference_number, f"-OVR-L{level}"),
+                    notes=f"Level {level} override for {base_commission.consultant.username}",
+                    override_level=level,
+                    parent_commission=base_commission,
+                    created_by=created_by,
+                    client_name=base_commission.client_name
+                ))
+            overrides_by_base.append(override_commissions)
+        
+        all_overrides = [c for override_commissions in overrides_by_base for c in override_commissions]
+        if all_overrides:
+            try:
+                Commission.objects.bulk_create(all_overrides, batch_size=BULK_BATCH_SIZE)
+            except IntegrityError:
+                # A derived -OVR- reference clashing with an existing or concurrent row
+                raise ValidationError({'reference_number': [DUPLICATE_REFERENCE_MESSAGE]})
+        
+        # Approval records for every row (what the signal would create).
+        # Bases are assigned to their direct manager (first in chain) up front;
+        # with no manager they stay unassigned for Admin.
+        approvals = []
+        submissions = []
+        for base_commission, override_chain in zip(base_commissions, override_chains):
+            approval = CommissionApproval(commission=base_commission)
+            if override_chain:
+                approval.assigned_approver = override_chain[0][0]
+                approval.assigned_role = 'manager'
+                submissions.append(approval)
+            approvals.append(approval)
+        CommissionApproval.objects.bulk_create(
+            approvals + [CommissionApproval(commission=c) for c in all_overrides],
+            batch_size=BULK_BATCH_SIZE
+        )
         
-        if direct_manager:
-            approval = CommissionApproval.objects.create(
-                commission=base_commission,
-                assigned_approver=direct_manager,
-                assigned_role='manager'
-            )
-            
-            # Log the submission action
-            ApprovalHistory.objects.create(
+        # Log the submission actions
+        ApprovalHistory.objects.bulk_create([
+            ApprovalHistory(
                 approval_record=approval,
                 action='SUBMIT',
-                actor=desc_consultant if created_by is None else created_by,
+                actor=approval.commission.consultant if created_by is None else created_by,
                 from_state='draft',
                 to_state='submitted',
-                notes=notes
+                notes=approval.commission.notes
             )
-        
-        # Auto-submit the base commission so it appears in manager's pending approvals
-        # This moves it from 'draft' to 'submitted' state
-        base_commission.state = 'submitted'
-        base_commission.save()
-        
-        # Also submit override commissions
-        for override_comm in override_commissions:
-            override_comm.state = 'submitted'
-            override_comm.save()
-        
-        return {
-            'base_commission': base_commission,
-            'override_commissions': override_commissions,
-            'total_created': 1 + len(override_commissions)
-        }
+            for approval in submissions
+        ], batch_size=BULK_BATCH_SIZE)
+        
+        # Base and override commissions are created directly in 'submitted' state
+        # so they appear in the manager's pending approvals
+        
+        return [
+            {
+                'base_commission': base_commission,
+                'override_commissions': override_commissions,
+                'total_created': 1 + len(override_commissions)
+            }
+            for base_commission, override_commissions in zip(base_commissions, overrides_by_base)
+        ]
 
 
 class StateTransitionService:
@@ -275,22 +433,55 @@ class StateTransitionService:
     Enforces state machine rules and records actors.
     """
     
-    # Valid state transitions (same as serializer)
-    VALID_TRANSITIONS = {
-        'draft': ['submitted'],
-        'submitted': ['approved', 'rejected'],
-        'approved': ['paid'],
-        'rejected': ['draft'],
-        'paid': [],  # Final state
-    }
+    # Valid (from_state, to_state) pairs; 'paid' is final (also used by the serializer)
+    ALLOWED_TRANSITIONS = frozenset({
+        ('draft', 'submitted'),
+        ('submitted', 'approved'),
+        ('submitted', 'rejected'),
+        ('approved', 'paid'),
+        ('rejected', 'draft'),
+    })
     
     @classmethod
     def can_transition(cls, from_state, to_state):
         """Check if transition is valid"""
-        return to_state in cls.VALID_TRANSITIONS.get(from_state, [])
+        return (from_state, to_state) in cls.ALLOWED_TRANSITIONS
+    
+    @classmethod
+    def _apply(cls, commission, to_state, values, note_label=None, notes=''):
+        """
+        Move the commission to to_state with one conditional UPDATE.
+        
+        The row is only written while its current state may move to to_state,
+        so a stale instance or a concurrent request cannot re-apply or skip a
+        transition. Notes are appended in the database. On success the
+        instance gets the written values; on failure its state is refreshed
+        and ValidationError is raised.
+        """
+        from_states = [f for f, t in cls.ALLOWED_TRANSITIONS if t == to_state]
+        values = {'state': to_state, 'updated_at': timezone.now(), **values}
+        
+        db_values = dict(values)
+        if notes:
+            db_values['notes'] = Concat(F('notes'), Value(f"\n[{note_label}] {notes}"))
+        
+        updated = Commission.objects.filter(
+            pk=commission.pk, state__in=from_states
+        ).update(**db_values)
+        if not updated:
+            current = Commission.objects.filter(pk=commission.pk).values_list('state', flat=True).first()
+            commission.state = current
+            raise ValidationError(
+                f"Cannot transition from '{current}' to '{to_state}'."
+            )
+        
+        for field, value in values.items():
+            setattr(commission, field, value)
+        if notes:
+            commission.refresh_from_db(fields=['notes'])
+        return commission
     
     @classmethod
-    @transaction.atomic
     def transition_to_submitted(cls, commission, actor=None, notes=''):
         """
         Transition commission from draft to submitted.
@@ -306,17 +497,7 @@ class StateTransitionService:
         Raises:
             ValidationError: If transition is invalid
         """
-        if not cls.can_transition(commission.state, 'submitted'):
-            raise ValidationError(
-                f"Cannot transition from '{commission.state}' to 'submitted'."
-            )
-        
-        commission.state = 'submitted'
-        if notes:
-            commission.notes = f"{commission.notes}\n[Submitted] {notes}"
-        commission.save()
-        
-        return commission
+        return cls._apply(commission, 'submitted', {}, 'Submitted', notes)
     
     @classmethod
     @transaction.atomic
@@ -325,63 +506,37 @@ class StateTransitionService:
         Transition commission from submitted to approved.
         
         Also approves related override commissions.
-        """
-        if not cls.can_transition(commission.state, 'approved'):
-            raise ValidationError(
-                f"Cannot transition from '{commission.state}' to 'approved'."
-            )
         
-        commission.state = 'approved'
-        commission.approved_by = actor
-        commission.approved_at = datetime.now()
-        if notes:
-            commission.notes = f"{commission.notes}\n[Approved] {notes}"
-        commission.save()
+        Returns (commission, number of overrides approved with it); the count
+        is the cascade UPDATE's row count, so callers need no extra COUNT.
+        """
+        now = timezone.now()
+        cls._apply(
+            commission, 'approved',
+            {'approved_by': actor, 'approved_at': now},
+            'Approved', notes
+        )
         
-        # If this is a base commission, also approve related overrides
+        # If this is a base commission, also approve related overrides (one UPDATE)
+        related_approved = 0
         if commission.commission_type == 'base':
-            related_overrides = Commission.objects.filter(
+            related_approved = Commission.objects.filter(
                 parent_commission=commission,
-                commission_type='override'
-            )
-            for override_comm in related_overrides:
-                if override_comm.state == 'submitted':
-                    override_comm.state = 'approved'
-                    override_comm.approved_by = actor
-                    override_comm.approved_at = datetime.now()
-                    override_comm.save()
+                commission_type='override',
+                state='submitted'
+            ).update(state='approved', approved_by=actor, approved_at=now, updated_at=now)
         
-        return commission
+        return commission, related_approved
     
     @classmethod
-    @transaction.atomic
     def transition_to_rejected(cls, commission, actor, rejection_reason):
         """Transition commission from submitted to rejected"""
-        if not cls.can_transition(commission.state, 'rejected'):
-            raise ValidationError(
-                f"Cannot transition from '{commission.state}' to 'rejected'."
-            )
-        
-        commission.state = 'rejected'
-        commission.rejection_reason = rejection_reason
-        commission.save()
-        
-        return commission
+        return cls._apply(commission, 'rejected', {'rejection_reason': rejection_reason})
     
     @classmethod
-    @transaction.atomic
     def transition_to_paid(cls, commission, actor, paid_at=None):
         """Transition commission from approved to paid"""
-        if not cls.can_transition(commission.state, 'paid'):
-            raise ValidationError(
-                f"Cannot transition from '{commission.state}' to 'paid'."
-            )
-        
-        commission.state = 'paid'
-        commission.paid_at = paid_at or datetime.now()
-        commission.save()
-        
-        return commission
+        return cls._apply(commission, 'paid', {'paid_at': paid_at or timezone.now()})
 
 
 class AdjustmentService:
@@ -424,7 +579,10 @@ class AdjustmentService:
         if adjustment_amount == 0:
             raise ValidationError("Adjustment amount cannot be zero.")
         
-        # Create adjustment commission
+        # Create adjustment commission (the random suffix keeps the reference
+        # unique, so a long original reference is shortened to fit the column)
+        suffix = f"-ADJ-{uuid.uuid4().hex[:12]}"
+        reference_number = original_commission.reference_number[:REFERENCE_MAX_LENGTH - len(suffix)] + suffix
         adjustment = Commission.objects.create(
             commission_type='adjustment',
             consultant=original_commission.consultant,
@@ -432,10 +590,10 @@ class AdjustmentService:
             transaction_date=original_commission.transaction_date,
             sale_amount=original_commission.sale_amount,
             gst_rate=original_commission.gst_rate,
-            commission_rate=Decimal('0.00'),  # Not applicable for adjustments
+            commission_rate=_ZERO,  # Not applicable for adjustments
             calculated_amount=adjustment_amount,
             state='draft',
-            reference_number=f"{original_commission.reference_number}-ADJ-{datetime.now().timestamp()}",
+            reference_number=reference_number,
             notes=notes,
             adjustment_for=original_commission,
             created_by=created_by
@@ -0,0 +1,18 @@
+"""
+Signals for the commissions app.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Commission, CommissionApproval
+
+
+@receiver(post_save, sender=Commission)
+def create_approval_record(sender, instance, created, **kwargs):
+    """
+    Create the approval workflow record together with the commission.
+    
+    Later transitions can then use the (cached) record instead of looking it up.
+    """
+    if created:
+        CommissionApproval.objects.create(commission=instance)
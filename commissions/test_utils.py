@@ -0,0 +1,33 @@
+"""
+Shared fixtures for the commissions test modules.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+
+User = get_user_model()
+
+ADMIN_FIELDS = {'email': 'admin@test.com', 'is_staff': True, 'is_superuser': True}
+
+
+def create_test_users(**users):
+    """
+    Create users (username -> extra fields) with one INSERT and one password hash.
+    Returns them in argument order.
+    """
+    password = make_password('password123')
+    return User.objects.bulk_create([
+        User(username=username, password=password, **fields) for username, fields in users.items()
+    ])
+
+
+class CommissionUsersMixin:
+    """Shared consultant/manager/admin trio, created once per TestCase class."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.consultant, cls.manager, cls.admin = create_test_users(
+            consultant={'email': 'c@test.com'},
+            manager={'email': 'm@test.com'},
+            admin=ADMIN_FIELDS,
+        )
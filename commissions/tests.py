@@ -13,9 +13,13 @@ from decimal import Decimal
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
 from datetime import date, datetime, timedelta
 
-from commissions.models import Commission
+from commissions.models import ApprovalHistory, Commission, CommissionApproval
 from commissions.services import (
     CommissionCalculationService,
     OverrideResolutionService,
@@ -23,6 +27,14 @@ from commissions.services import (
     StateTransitionService,
     AdjustmentService,
 )
+from commissions.serializers import (
+    BulkCommissionCreateSerializer,
+    CommissionAdjustmentSerializer,
+    CommissionCreateSerializer,
+    CommissionReadSerializer,
+    NESTED_HISTORY_LIMIT,
+)
+from commissions.test_utils import CommissionUsersMixin
 from hierarchy.models import ReportingLine
 
 User = get_user_model()
@@ -52,6 +64,15 @@ class CommissionCalculationServiceTest(TestCase):
         )
         self.assertEqual(amount, Decimal('50.00'))
     
+    def test_non_decimal_inputs_match_decimal_inputs(self):
+        """Floats and ints go through str() and give the same result"""
+        amount = CommissionCalculationService.calculate_base_commission(
+            sale_amount=1100.0,
+            commission_rate=5,
+            gst_rate='10.00'
+        )
+        self.assertEqual(amount, Decimal('50.00'))
+    
     def test_decimal_precision(self):
         """Ensure no floating point errors"""
         amount = CommissionCalculationService.calculate_base_commission(
@@ -61,30 +82,44 @@ class CommissionCalculationServiceTest(TestCase):
         )
         # Result should be 3333.33 * 0.0777 = 259.00
         self.assertEqual(amount, Decimal('259.00'))
+    
+    def test_shared_net_amount_matches_per_rate_calculation(self):
+        """Commissions on one precomputed net amount equal the full per-rate calculation"""
+        net = CommissionCalculationService.net_sale_amount(Decimal('1234.56'), Decimal('15.00'))
+        for rate in (Decimal('7.00'), Decimal('2.00'), Decimal('1.00')):
+            self.assertEqual(
+                CommissionCalculationService.commission_on_net(net, rate),
+                CommissionCalculationService.calculate_override_commission(
+                    Decimal('1234.56'), rate, Decimal('15.00')
+                )
+            )
 
 
 class OverrideResolutionServiceTest(TestCase):
     """Test override resolution using hierarchy"""
     
-    def setUp(self):
-        """Create test users and hierarchy"""
-        self.consultant = User.objects.create_user('consultant', 'c@test.com', 'pass')
-        self.manager1 = User.objects.create_user('manager1', 'm1@test.com', 'pass')
-        self.manager2 = User.objects.create_user('manager2', 'm2@test.com', 'pass')
+    @classmethod
+    def setUpTestData(cls):
+        """Create test users and hierarchy (shared by every test in the class)"""
+        cls.consultant = User.objects.create_user('consultant', 'c@test.com', 'pass')
+        cls.manager1 = User.objects.create_user('manager1', 'm1@test.com', 'pass')
+        cls.manager2 = User.objects.create_user('manager2', 'm2@test.com', 'pass')
         
-        # Create hierarchy: consultant → manager1 → manager2
-        ReportingLine.objects.create(
-            consultant=self.consultant,
-            manager=self.manager1,
-            start_date=date(2026, 1, 1),
-            is_active=True
-        )
-        ReportingLine.objects.create(
-            consultant=self.manager1,
-            manager=self.manager2,
-            start_date=date(2026, 1, 1),
-            is_active=True
-        )
+        # Create hierarchy: consultant → manager1 → manager2 (one INSERT)
+        ReportingLine.objects.bulk_create([
+            ReportingLine(
+                consultant=cls.consultant,
+                manager=cls.manager1,
+                start_date=date(2026, 1, 1),
+                is_active=True
+            ),
+            ReportingLine(
+                consultant=cls.manager1,
+                manager=cls.manager2,
+                start_date=date(2026, 1, 1),
+                is_active=True
+            ),
+        ])
     
     def test_get_manager_at_date(self):
         """Test finding manager at specific date"""
@@ -106,6 +141,27 @@ class OverrideResolutionServiceTest(TestCase):
         self.assertEqual(chain[0], (self.manager1, 1))
         self.assertEqual(chain[1], (self.manager2, 2))
     
+    def test_resolve_override_chain_query_count(self):
+        """Whole chain, managers included, comes from one recursive query"""
+        with self.assertNumQueries(1):
+            chain = OverrideResolutionService.resolve_override_chain(
+                self.consultant,
+                date(2026, 1, 15),
+                max_levels=2
+            )
+        self.assertEqual(chain, [(self.manager1, 1), (self.manager2, 2)])
+    
+    def test_resolve_override_chain_respects_dates(self):
+        """Lines that ended before the transaction are not followed"""
+        ReportingLine.objects.filter(consultant=self.manager1).update(
+            is_active=False, end_date=date(2026, 1, 10)
+        )
+        chain = OverrideResolutionService.resolve_override_chain(
+            self.consultant,
+            date(2026, 1, 15)
+        )
+        self.assertEqual(chain, [(self.manager1, 1)])
+    
     def test_no_manager_found(self):
         """Test when consultant has no manager"""
         orphan = User.objects.create_user('orphan', 'o@test.com', 'pass')
@@ -116,35 +172,36 @@ class OverrideResolutionServiceTest(TestCase):
         self.assertEqual(len(chain), 0)
 
 
-class CommissionCreationServiceTest(TestCase):
+class CommissionCreationServiceTest(CommissionUsersMixin, TestCase):
     """Test commission creation with overrides"""
     
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         """Setup test data"""
-        self.consultant = User.objects.create_user('consultant', 'c@test.com', 'pass')
-        self.manager = User.objects.create_user('manager', 'm@test.com', 'pass')
-        self.admin = User.objects.create_user('admin', 'a@test.com', 'pass', is_staff=True)
-        
+        super().setUpTestData()
         ReportingLine.objects.create(
-            consultant=self.consultant,
-            manager=self.manager,
+            consultant=cls.consultant,
+            manager=cls.manager,
             start_date=date(2026, 1, 1),
             is_active=True
         )
     
     def test_create_base_commission_with_overrides(self):
         """Test creating commission automatically creates overrides"""
-        result = CommissionCreationService.create_base_commission_with_overrides(
-            consultant=self.consultant,
-            transaction_date=date(2026, 1, 15),
-            sale_amount=Decimal('1000.00'),
-            gst_rate=Decimal('0.00'),
-            commission_rate=Decimal('5.00'),
-            reference_number='TEST-001',
-            notes='Test sale',
-            created_by=self.admin,
-            client_name='Test Client'
-        )
+        # Savepoint, chain CTE (with managers), base INSERT, overrides INSERT,
+        # approvals INSERT, SUBMIT history INSERT, release
+        with self.assertNumQueries(7):
+            result = CommissionCreationService.create_base_commission_with_overrides(
+                consultant=self.consultant,
+                transaction_date=date(2026, 1, 15),
+                sale_amount=Decimal('1000.00'),
+                gst_rate=Decimal('0.00'),
+                commission_rate=Decimal('5.00'),
+                reference_number='TEST-001',
+                notes='Test sale',
+                created_by=self.admin,
+                client_name='Test Client'
+            )
         
         # Should create 1 base + 1 override
         self.assertEqual(result['total_created'], 2)
@@ -166,6 +223,100 @@ class CommissionCreationServiceTest(TestCase):
         self.assertEqual(override.parent_commission, base)
         self.assertEqual(override.client_name, 'Test Client')
     
+    def test_shared_chain_cache_resolves_each_consultant_date_once(self):
+        """Bulk rows for the same consultant and date reuse one chain lookup"""
+        chain_cache = {}
+        with CaptureQueriesContext(connection) as ctx:
+            for i in range(3):
+                CommissionCreationService.create_base_commission_with_overrides(
+                    consultant=self.consultant,
+                    transaction_date=date(2026, 1, 15),
+                    sale_amount=Decimal('1000.00'),
+                    gst_rate=Decimal('0.00'),
+                    commission_rate=Decimal('5.00'),
+                    reference_number=f'TEST-CACHE-{i}',
+                    created_by=self.admin,
+                    chain_cache=chain_cache
+                )
+        
+        chain_queries = [q for q in ctx.captured_queries if 'WITH RECURSIVE' in q['sql']]
+        self.assertEqual(len(chain_queries), 1)
+        self.assertEqual(Commission.objects.filter(commission_type='override').count(), 3)
+    
+    def test_overrides_inserted_in_bulk_with_approval_records(self):
+        """Overrides are written with one INSERT and still get approval records"""
+        senior = User.objects.create_user('senior', 's@test.com', 'pass')
+        ReportingLine.objects.create(
+            consultant=self.manager,
+            manager=senior,
+            start_date=date(2026, 1, 1),
+            is_active=True
+        )
+        
+        with CaptureQueriesContext(connection) as ctx:
+            result = CommissionCreationService.create_base_commission_with_overrides(
+                consultant=self.consultant,
+                transaction_date=date(2026, 1, 15),
+                sale_amount=Decimal('1000.00'),
+                gst_rate=Decimal('0.00'),
+                commission_rate=Decimal('5.00'),
+                reference_number='TEST-BULK',
+                created_by=self.admin
+            )
+        
+        self.assertEqual(len(result['override_commissions']), 2)
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "commissions_commission"')]
+        self.assertEqual(len(inserts), 2)  # base + one multi-row insert for overrides
+        approval_writes = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith(('INSERT INTO "commissions_approval"', 'UPDATE "commissions_approval"'))
+        ]
+        self.assertEqual(len(approval_writes), 1)  # all approval records, already assigned
+        base_approval = CommissionApproval.objects.get(commission=result['base_commission'])
+        self.assertEqual(base_approval.assigned_approver, self.manager)
+        self.assertEqual(base_approval.assigned_role, 'manager')
+        for override in result['override_commissions']:
+            self.assertIsNotNone(override.pk)
+            self.assertEqual(override.approval.commission_id, override.pk)
+            self.assertEqual(override.state, 'submitted')
+    
+    def test_clashing_override_reference_fails_as_validation_error(self):
+        """A derived -OVR- reference that already exists is a field error, not a 500"""
+        Commission.objects.create(
+            commission_type='base', consultant=self.consultant,
+            transaction_date=date(2026, 1, 1), sale_amount=Decimal('1.00'),
+            commission_rate=Decimal('1.00'), calculated_amount=Decimal('0.01'),
+            reference_number='TEST-CLASH-OVR-L1'
+        )
+        
+        with self.assertRaises(ValidationError) as cm:
+            CommissionCreationService.create_base_commission_with_overrides(
+                consultant=self.consultant,
+                transaction_date=date(2026, 1, 15),
+                sale_amount=Decimal('1000.00'),
+                gst_rate=Decimal('0.00'),
+                commission_rate=Decimal('5.00'),
+                reference_number='TEST-CLASH',
+                created_by=self.admin
+            )
+        self.assertIn('reference_number', cm.exception.message_dict)
+        self.assertFalse(Commission.objects.filter(reference_number='TEST-CLASH').exists())
+    
+    def test_override_reference_too_long_fails(self):
+        """A base reference with no room for the -OVR- suffix is rejected before writing"""
+        with self.assertRaises(ValidationError) as cm:
+            CommissionCreationService.create_base_commission_with_overrides(
+                consultant=self.consultant,
+                transaction_date=date(2026, 1, 15),
+                sale_amount=Decimal('1000.00'),
+                gst_rate=Decimal('0.00'),
+                commission_rate=Decimal('5.00'),
+                reference_number='R' * 50,
+                created_by=self.admin
+            )
+        self.assertIn('reference_number', cm.exception.message_dict)
+        self.assertFalse(Commission.objects.filter(reference_number='R' * 50).exists())
+    
     def test_duplicate_reference_number_fails(self):
         """Test that duplicate reference numbers are prevented"""
         CommissionCreationService.create_base_commission_with_overrides(
@@ -179,8 +330,8 @@ class CommissionCreationServiceTest(TestCase):
             client_name='Test Client'
         )
         
-        # Try to create duplicate
-        with self.assertRaises(Exception):
+        # Try to create duplicate (the unique violation surfaces as a field error)
+        with self.assertRaises(ValidationError) as cm:
             CommissionCreationService.create_base_commission_with_overrides(
                 consultant=self.consultant,
                 transaction_date=date(2026, 1, 16),
@@ -191,19 +342,18 @@ class CommissionCreationServiceTest(TestCase):
                 created_by=self.admin,
                 client_name='Test Client'
             )
+        self.assertIn('reference_number', cm.exception.message_dict)
+        self.assertEqual(Commission.objects.filter(reference_number='TEST-DUP').count(), 1)
 
 
-class StateTransitionServiceTest(TestCase):
+class StateTransitionServiceTest(CommissionUsersMixin, TestCase):
     """Test commission state transitions"""
     
     def setUp(self):
-        """Create test commission"""
-        self.user = User.objects.create_user('user', 'u@test.com', 'pass')
-        self.admin = User.objects.create_user('admin', 'a@test.com', 'pass', is_staff=True)
-        
+        """Create test commission (mutated by each test)"""
         self.commission = Commission.objects.create(
             commission_type='base',
-            consultant=self.user,
+            consultant=self.consultant,
             transaction_date=date(2026, 1, 15),
             sale_amount=Decimal('1000.00'),
             gst_rate=Decimal('0.00'),
@@ -211,14 +361,21 @@ class StateTransitionServiceTest(TestCase):
             calculated_amount=Decimal('50.00'),
             state='draft',
             reference_number='TEST-STATE-001',
-            created_by=self.user
+            created_by=self.consultant
         )
     
+    def test_can_transition_pairs(self):
+        """Only the state machine's (from, to) pairs are allowed"""
+        self.assertTrue(StateTransitionService.can_transition('draft', 'submitted'))
+        self.assertTrue(StateTransitionService.can_transition('submitted', 'rejected'))
+        self.assertFalse(StateTransitionService.can_transition('paid', 'draft'))
+        self.assertFalse(StateTransitionService.can_transition('unknown', 'draft'))
+    
     def test_draft_to_submitted(self):
         """Test draft → submitted transition"""
         StateTransitionService.transition_to_submitted(
             self.commission,
-            actor=self.user
+            actor=self.consultant
         )
         self.commission.refresh_from_db()
         self.assertEqual(self.commission.state, 'submitted')
@@ -237,6 +394,39 @@ class StateTransitionServiceTest(TestCase):
         self.assertEqual(self.commission.approved_by, self.admin)
         self.assertIsNotNone(self.commission.approved_at)
     
+    def test_approval_cascades_to_submitted_overrides(self):
+        """Submitted overrides are approved together with their base"""
+        self.commission.state = 'submitted'
+        self.commission.save()
+        # No approval records needed here, so skip the per-row post_save signal
+        overrides = Commission.objects.bulk_create([
+            Commission(
+                commission_type='override',
+                consultant=self.consultant,
+                manager=self.manager,
+                transaction_date=date(2026, 1, 15),
+                sale_amount=Decimal('1000.00'),
+                commission_rate=Decimal('2.00'),
+                calculated_amount=Decimal('20.00'),
+                state=state,
+                reference_number=f'TEST-STATE-001-OVR-{i}',
+                parent_commission=self.commission
+            )
+            for i, state in enumerate(['submitted', 'submitted', 'draft'])
+        ])
+        
+        _, related_approved = StateTransitionService.transition_to_approved(
+            self.commission, actor=self.admin
+        )
+        
+        self.assertEqual(related_approved, 2)
+        states = list(Commission.objects.filter(
+            pk__in=[o.pk for o in overrides]
+        ).order_by('reference_number').values_list('state', 'approved_by'))
+        self.assertEqual(states, [
+            ('approved', self.admin.pk), ('approved', self.admin.pk), ('draft', None)
+        ])
+    
     def test_approved_to_paid(self):
         """Test approved → paid transition"""
         self.commission.state = 'approved'
@@ -272,27 +462,71 @@ class StateTransitionServiceTest(TestCase):
         self.commission.refresh_from_db()
         self.assertEqual(self.commission.state, 'rejected')
         self.assertEqual(self.commission.rejection_reason, 'Incorrect amount')
+    
+    def test_transition_checks_current_row_state(self):
+        """A stale instance cannot re-apply a transition another request already made"""
+        self.commission.state = 'submitted'
+        self.commission.save()
+        stale = Commission.objects.get(pk=self.commission.pk)
+        StateTransitionService.transition_to_approved(self.commission, actor=self.admin)
+        
+        with self.assertRaises(ValidationError):
+            StateTransitionService.transition_to_approved(stale, actor=self.admin)
+        self.assertEqual(stale.state, 'approved')
+    
+    def test_transition_writes_only_changed_fields(self):
+        """Transitions do not overwrite columns they did not touch"""
+        self.commission.state = 'submitted'
+        self.commission.save()
+        Commission.objects.filter(pk=self.commission.pk).update(client_name='Updated elsewhere')
+        
+        StateTransitionService.transition_to_rejected(
+            self.commission,
+            actor=self.admin,
+            rejection_reason='Incorrect amount'
+        )
+        self.commission.refresh_from_db()
+        self.assertEqual(self.commission.state, 'rejected')
+        self.assertEqual(self.commission.client_name, 'Updated elsewhere')
+    
+    def test_transition_is_one_conditional_update(self):
+        """A valid transition costs a single UPDATE and updates the instance"""
+        with self.assertNumQueries(1):
+            StateTransitionService.transition_to_submitted(self.commission, actor=self.consultant)
+        self.assertEqual(self.commission.state, 'submitted')
+        
+        with self.assertNumQueries(1):
+            StateTransitionService.transition_to_rejected(
+                self.commission, actor=self.admin, rejection_reason='Incorrect amount'
+            )
+        self.assertEqual(self.commission.rejection_reason, 'Incorrect amount')
+    
+    def test_transition_notes_appended_to_current_value(self):
+        """Notes are appended in the database, keeping notes written elsewhere"""
+        Commission.objects.filter(pk=self.commission.pk).update(notes='Written elsewhere')
+        StateTransitionService.transition_to_submitted(
+            self.commission, actor=self.consultant, notes='Ready'
+        )
+        self.assertEqual(self.commission.notes, 'Written elsewhere\n[Submitted] Ready')
 
 
-class AdjustmentServiceTest(TestCase):
+class AdjustmentServiceTest(CommissionUsersMixin, TestCase):
     """Test adjustment creation"""
     
     def setUp(self):
         """Create paid commission"""
-        self.user = User.objects.create_user('user', 'u@test.com', 'pass')
-        self.admin = User.objects.create_user('admin', 'a@test.com', 'pass', is_staff=True)
-        
         self.paid_commission = Commission.objects.create(
             commission_type='base',
-            consultant=self.user,
+            consultant=self.consultant,
             transaction_date=date(2026, 1, 15),
             sale_amount=Decimal('1000.00'),
             gst_rate=Decimal('0.00'),
             commission_rate=Decimal('5.00'),
             calculated_amount=Decimal('50.00'),
             state='paid',
+            paid_at=timezone.now(),
             reference_number='TEST-ADJ-001',
-            created_by=self.user
+            created_by=self.consultant
         )
     
     def test_create_adjustment_for_paid_commission(self):
@@ -309,11 +543,54 @@ class AdjustmentServiceTest(TestCase):
         self.assertEqual(adjustment.adjustment_for, self.paid_commission)
         self.assertEqual(adjustment.state, 'draft')
     
+    def test_adjustment_reference_fits_column(self):
+        """A maximum-length original reference is shortened, not overflowed"""
+        Commission.objects.filter(pk=self.paid_commission.pk).update(reference_number='R' * 50)
+        self.paid_commission.refresh_from_db()
+        
+        adjustment = AdjustmentService.create_adjustment(
+            original_commission=self.paid_commission,
+            adjustment_amount=Decimal('-1.00'),
+            notes='Correction',
+            created_by=self.admin
+        )
+        self.assertEqual(len(adjustment.reference_number), 50)
+        self.assertIn('-ADJ-', adjustment.reference_number)
+    
+    def test_back_to_back_adjustments_get_distinct_references(self):
+        """Adjustment references do not depend on the clock and cannot collide"""
+        refs = {
+            AdjustmentService.create_adjustment(
+                original_commission=self.paid_commission,
+                adjustment_amount=Decimal('-1.00'),
+                notes=f'Correction {i}',
+                created_by=self.admin
+            ).reference_number
+            for i in range(3)
+        }
+        self.assertEqual(len(refs), 3)
+        for ref in refs:
+            self.assertTrue(ref.startswith('TEST-ADJ-001-ADJ-'))
+    
+    def test_adjustment_notes_need_ten_non_blank_characters(self):
+        """Surrounding whitespace does not count towards the minimum"""
+        context = {'original_commission': self.paid_commission}
+        short = CommissionAdjustmentSerializer(
+            data={'adjustment_amount': '-5.00', 'notes': '   too short   '}, context=context
+        )
+        self.assertFalse(short.is_valid())
+        self.assertIn('minimum 10 characters', str(short.errors['notes'][0]))
+        
+        valid = CommissionAdjustmentSerializer(
+            data={'adjustment_amount': '-5.00', 'notes': 'Overpayment correction'}, context=context
+        )
+        self.assertTrue(valid.is_valid(), valid.errors)
+    
     def test_adjustment_for_non_paid_fails(self):
         """Test adjustment only works for paid commissions"""
         draft_commission = Commission.objects.create(
             commission_type='base',
-            consultant=self.user,
+            consultant=self.consultant,
             transaction_date=date(2026, 1, 16),
             sale_amount=Decimal('1000.00'),
             gst_rate=Decimal('0.00'),
@@ -321,7 +598,7 @@ class AdjustmentServiceTest(TestCase):
             calculated_amount=Decimal('50.00'),
             state='draft',
             reference_number='TEST-ADJ-002',
-            created_by=self.user
+            created_by=self.consultant
         )
         
         with self.assertRaises(ValidationError):
@@ -343,18 +620,14 @@ class AdjustmentServiceTest(TestCase):
             )
 
 
-class CommissionModelTest(TestCase):
+class CommissionModelTest(CommissionUsersMixin, TestCase):
     """Test Commission model constraints"""
     
-    def setUp(self):
-        self.user = User.objects.create_user('user', 'u@test.com', 'pass')
-        self.manager = User.objects.create_user('manager', 'm@test.com', 'pass')
-    
     def test_base_commission_cannot_have_manager(self):
         """Test base commissions must not have manager field"""
         commission = Commission(
             commission_type='base',
-            consultant=self.user,
+            consultant=self.consultant,
             manager=self.manager,  # Should not be set for base
             transaction_date=date(2026, 1, 15),
             sale_amount=Decimal('1000.00'),
@@ -366,13 +639,15 @@ class CommissionModelTest(TestCase):
         )
         
         with self.assertRaises(ValidationError):
+            commission.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
             commission.save()
     
     def test_override_must_have_manager(self):
         """Test override commissions must have manager"""
         commission = Commission(
             commission_type='override',
-            consultant=self.user,
+            consultant=self.consultant,
             manager=None,  # Should be set for override
             transaction_date=date(2026, 1, 15),
             sale_amount=Decimal('1000.00'),
@@ -384,4 +659,436 @@ class CommissionModelTest(TestCase):
         )
         
         with self.assertRaises(ValidationError):
+            commission.full_clean()
+        with self.assertRaises(IntegrityError), transaction.atomic():
             commission.save()
+    
+    def test_clean_loads_no_related_rows(self):
+        """Business rules are checked on FK ids, so a freshly loaded row validates without queries"""
+        approved = Commission.objects.create(
+            commission_type='base',
+            consultant=self.consultant,
+            transaction_date=date(2026, 1, 15),
+            sale_amount=Decimal('1000.00'),
+            commission_rate=Decimal('5.00'),
+            calculated_amount=Decimal('50.00'),
+            state='approved',
+            approved_by=self.admin,
+            reference_number='TEST-MODEL-003'
+        )
+        fresh = Commission.objects.get(pk=approved.pk)
+        with self.assertNumQueries(0):
+            fresh.clean()
+        
+        fresh.approved_by_id = self.consultant.pk
+        with self.assertNumQueries(0), self.assertRaises(ValidationError):
+            fresh.clean()
+
+
+class CommissionCreateSerializerTest(CommissionUsersMixin, APITestCase):
+    """Test create payload validation"""
+    
+    def setUp(self):
+        self.payload = {
+            'consultant_id': self.consultant.id,
+            'transaction_date': '2026-01-15',
+            'sale_amount': '1100.00',
+            'gst_rate': '10.00',
+            'commission_rate': '5.00',
+            'calculated_amount': '50.00',
+            'reference_number': 'SER-001',
+        }
+    
+    def test_calculated_amount_is_optional(self):
+        """Server computes the amount when the client omits it"""
+        payload = {k: v for k, v in self.payload.items() if k != 'calculated_amount'}
+        serializer = CommissionCreateSerializer(data=payload)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertNotIn('calculated_amount', serializer.validated_data)
+    
+    def test_calculated_amount_within_a_cent_accepted(self):
+        """Rounding differences of one cent are tolerated"""
+        serializer = CommissionCreateSerializer(data={**self.payload, 'calculated_amount': '50.01'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+    
+    def test_mismatched_calculated_amount_rejected(self):
+        """A supplied amount is still checked against the calculation"""
+        serializer = CommissionCreateSerializer(data={**self.payload, 'calculated_amount': '99.00'})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('calculated_amount', serializer.errors)
+    
+    def test_field_ranges(self):
+        """Built-in validators reject out-of-range values"""
+        serializer = CommissionCreateSerializer(data={
+            **self.payload, 'sale_amount': '0.00', 'gst_rate': '101.00', 'commission_rate': '0.00'
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(
+            set(serializer.errors),
+            {'sale_amount', 'gst_rate', 'commission_rate'}
+        )
+    
+    def test_duplicate_reference_rejected_by_insert(self):
+        """No uniqueness pre-check query; the API still answers 400 on the reference field"""
+        with self.assertNumQueries(1):  # consultant exists
+            self.assertTrue(CommissionCreateSerializer(data=self.payload).is_valid())
+        
+        self.client.force_authenticate(user=self.admin)
+        first = self.client.post('/api/commissions/create/', self.payload, format='json')
+        self.assertEqual(first.status_code, 201)
+        response = self.client.post('/api/commissions/create/', self.payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('reference_number', response.data)
+
+    def test_bulk_references_checked_in_one_query(self):
+        """Existing and in-batch duplicate references are flagged per row"""
+        Commission.objects.create(
+            commission_type='base', consultant=self.consultant,
+            transaction_date=date(2026, 1, 1), sale_amount=Decimal('1.00'),
+            commission_rate=Decimal('1.00'), calculated_amount=Decimal('0.01'),
+            reference_number='SER-001'
+        )
+        rows = [
+            self.payload,
+            {**self.payload, 'reference_number': 'SER-002'},
+            {**self.payload, 'reference_number': 'SER-002'},
+            {**self.payload, 'reference_number': 'SER-003'},
+        ]
+        serializer = BulkCommissionCreateSerializer(data={'commissions': rows})
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertFalse(serializer.is_valid())
+        ref_queries = [q for q in ctx.captured_queries if 'reference_number' in q['sql']]
+        self.assertEqual(len(ref_queries), 1)
+        errors = serializer.errors['commissions']
+        self.assertIn('reference_number', errors[0])
+        self.assertEqual(errors[1], {})
+        self.assertIn('reference_number', errors[2])
+        self.assertEqual(errors[3], {})
+    
+    def test_bulk_consultants_checked_in_one_query(self):
+        """The whole batch validates with one consultant and one reference query"""
+        rows = [{**self.payload, 'reference_number': f'SER-1{i}'} for i in range(5)]
+        rows[3]['consultant_id'] = 999999
+        serializer = BulkCommissionCreateSerializer(data={'commissions': rows})
+        with self.assertNumQueries(2):
+            self.assertFalse(serializer.is_valid())
+        errors = serializer.errors['commissions']
+        self.assertIn('consultant_id', errors[3])
+        self.assertEqual([e for i, e in enumerate(errors) if i != 3], [{}] * 4)
+    
+    def test_bulk_endpoint_query_count_does_not_grow_with_rows(self):
+        """Rows are written with multi-row INSERTs in one transaction"""
+        ReportingLine.objects.create(
+            consultant=self.consultant, manager=self.manager,
+            start_date=date(2026, 1, 1), is_active=True
+        )
+        self.client.force_authenticate(user=self.admin)
+        
+        def post(prefix, count):
+            rows = [{**self.payload, 'reference_number': f'{prefix}-{i}'} for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(
+                    '/api/commissions/bulk-create/', {'commissions': rows}, format='json'
+                )
+            self.assertEqual(response.status_code, 201, response.data)
+            return response, len(ctx.captured_queries)
+        
+        response, single = post('ONE', 1)
+        response, many = post('MANY', 5)
+        self.assertEqual(many, single)
+        self.assertEqual(response.data['created'], 10)
+        self.assertEqual([r['override_count'] for r in response.data['results']], [1] * 5)
+        self.assertEqual(
+            CommissionApproval.objects.filter(
+                commission__reference_number__startswith='MANY-', assigned_approver=self.manager
+            ).count(),
+            5
+        )
+
+
+class CommissionListEndpointTest(CommissionUsersMixin, APITestCase):
+    """Test list endpoints load only the columns they render"""
+    
+    def setUp(self):
+        self.base = Commission.objects.create(
+            commission_type='base',
+            consultant=self.consultant,
+            transaction_date=date(2026, 1, 15),
+            sale_amount=Decimal('1000.00'),
+            commission_rate=Decimal('5.00'),
+            calculated_amount=Decimal('50.00'),
+            reference_number='TEST-LIST-001',
+            client_name='Acme',
+            notes='x' * 5000
+        )
+    
+    def _add_override(self, level):
+        Commission.objects.create(
+            commission_type='override',
+            consultant=self.consultant,
+            manager=self.manager,
+            transaction_date=date(2026, 1, 15),
+            sale_amount=Decimal('1000.00'),
+            commission_rate=Decimal('2.00'),
+            calculated_amount=Decimal('20.00'),
+            reference_number=f'TEST-LIST-001-OVR-{level}',
+            override_level=level,
+            parent_commission=self.base
+        )
+    
+    def test_all_commissions_skips_text_columns(self):
+        self._add_override(1)
+        self.client.force_authenticate(user=self.admin)
+        
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/commissions/')
+        
+        self.assertEqual(response.status_code, 200)
+        select = [q['sql'] for q in ctx.captured_queries if 'LIMIT' in q['sql']][0]
+        self.assertNotIn('"notes"', select)
+        self.assertNotIn('"rejection_reason"', select)
+        # Overrides fall back to the parent's client name without extra queries
+        self.assertEqual({r['client_name'] for r in response.data['results']}, {'Acme'})
+    
+    def test_list_serializer_defers_unrendered_columns(self):
+        """Columns read only by the client-name annotation are not loaded"""
+        from commissions.serializers import CommissionListSerializer
+        self._add_override(1)
+        
+        rows = list(CommissionListSerializer.prefetch_queryset(Commission.objects.all()))
+        self.assertTrue({'notes', 'client_name', 'parent_commission_id'} <= rows[0].get_deferred_fields())
+        with self.assertNumQueries(0):
+            data = CommissionListSerializer(rows, many=True).data
+        self.assertEqual({row['client_name'] for row in data}, {'Acme'})
+    
+    def test_minimal_fields_render_usernames(self):
+        """?fields=minimal swaps nested user objects for usernames"""
+        self._add_override(1)
+        self.client.force_authenticate(user=self.admin)
+        
+        full = self.client.get('/api/commissions/').data['results']
+        minimal = self.client.get('/api/commissions/', {'fields': 'minimal'}).data['results']
+        
+        self.assertIsInstance(full[0]['consultant'], dict)
+        self.assertEqual(minimal[0]['consultant'], full[0]['consultant']['username'])
+        managers = {row['manager'] for row in minimal}
+        self.assertIn(None, managers)
+        self.assertIn(self.manager.username, managers)
+    
+    def test_all_commissions_query_count_is_constant(self):
+        self.client.force_authenticate(user=self.admin)
+        self._add_override(1)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/commissions/')
+        baseline = len(ctx.captured_queries)
+        
+        for level in range(2, 6):
+            self._add_override(level)
+        with self.assertNumQueries(baseline):
+            self.client.get('/api/commissions/')
+    
+    def test_read_serializer_prefetch_resolves_client_name(self):
+        """Serializing a prefetched queryset needs no further queries"""
+        from commissions.serializers import CommissionReadSerializer
+        self._add_override(1)
+        
+        queryset = CommissionReadSerializer.prefetch_queryset(Commission.objects.all())
+        rows = list(queryset)
+        with self.assertNumQueries(0):
+            data = CommissionReadSerializer(rows, many=True).data
+        
+        self.assertEqual({row['client_name'] for row in data}, {'Acme'})
+    
+    def test_repeated_users_serialized_once(self):
+        """A user appearing on many rows is rendered once per response"""
+        from commissions.serializers import CommissionReadSerializer
+        self._add_override(1)
+        self._add_override(2)
+        
+        data = CommissionReadSerializer(
+            CommissionReadSerializer.prefetch_queryset(Commission.objects.all()), many=True
+        ).data
+        
+        self.assertEqual(len(data), 3)
+        self.assertIs(data[0]['consultant'], data[1]['consultant'])
+        self.assertEqual(data[0]['consultant']['id'], self.base.consultant_id)
+    
+    def test_read_serializer_embeds_latest_history_only(self):
+        """Nested approval history is capped, newest entries kept in chronological order"""
+        approval = self.base.approval
+        start = timezone.now()
+        for i in range(NESTED_HISTORY_LIMIT + 2):
+            entry = ApprovalHistory.objects.create(
+                approval_record=approval, actor=self.admin, action='SUBMIT',
+                from_state='draft', to_state='submitted', notes=f'entry {i}'
+            )
+            ApprovalHistory.objects.filter(pk=entry.pk).update(timestamp=start + timedelta(minutes=i))
+        
+        row = CommissionReadSerializer.prefetch_queryset(Commission.objects.all()).get()
+        with self.assertNumQueries(0):
+            history = CommissionReadSerializer(row).data['approval']['history']
+        
+        self.assertEqual(
+            [entry['notes'] for entry in history],
+            [f'entry {i}' for i in range(2, NESTED_HISTORY_LIMIT + 2)]
+        )
+    
+    def test_read_serializer_without_approval_record(self):
+        CommissionApproval.objects.filter(commission=self.base).delete()
+        
+        row = CommissionReadSerializer.prefetch_queryset(Commission.objects.all()).get()
+        with self.assertNumQueries(0):
+            self.assertIsNone(CommissionReadSerializer(row).data['approval'])
+    
+    def test_team_summary_is_one_grouped_query(self):
+        """Team and metrics come from one GROUP BY, whatever the team size"""
+        quiet = User.objects.create_user('quiet', 'q@test.com', 'pass')
+        for consultant in (self.consultant, quiet):
+            ReportingLine.objects.create(
+                consultant=consultant, manager=self.manager,
+                start_date=date(2026, 1, 1), is_active=True
+            )
+        Commission.objects.filter(pk=self.base.pk).update(state='submitted')
+        self.client.force_authenticate(user=self.manager)
+        
+        # Team members, usernames and metrics in one grouped join (also the manager check)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/commissions/my-team/')
+        
+        rows = {row['consultant']['username']: row for row in response.data['results']}
+        self.assertEqual(Decimal(rows['consultant']['total_sales_volume']), Decimal('1000.00'))
+        self.assertEqual(rows['consultant']['pending_count'], 1)
+        self.assertEqual(Decimal(rows['consultant']['pending_value']), Decimal('50.00'))
+        self.assertEqual(rows['consultant']['total_commissions_count'], 1)
+        self.assertEqual(rows['quiet']['total_commission_earned'], '0')
+        self.assertEqual(rows['quiet']['pending_count'], 0)
+    
+    def test_summary_is_one_query(self):
+        """Dashboard figures use conditional sums, not a query per state or type"""
+        self._add_override(1)
+        Commission.objects.create(
+            commission_type='base', consultant=self.consultant, state='approved',
+            transaction_date=date(2026, 1, 20), sale_amount=Decimal('500.00'),
+            commission_rate=Decimal('5.00'), calculated_amount=Decimal('25.00'),
+            reference_number='TEST-LIST-002'
+        )
+        self.client.force_authenticate(user=self.consultant)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/commissions/summary/', {'start_date': '2026-01-01', 'end_date': '2026-01-31'}
+            )
+        
+        base = response.data['base_commissions']
+        self.assertEqual(base['count'], 2)
+        self.assertEqual(Decimal(base['total']), Decimal('75.00'))
+        self.assertEqual(Decimal(base['draft']), Decimal('50.00'))
+        self.assertEqual(Decimal(base['approved']), Decimal('25.00'))
+        self.assertEqual(base['paid'], '0')
+        self.assertEqual(response.data['override_commissions']['count'], 0)
+        # Totals are added as Decimals, not floats
+        self.assertEqual(Decimal(response.data['total_earnings']), Decimal('75.00'))
+        self.assertEqual(Decimal(response.data['ready_for_payout']), Decimal('25.00'))
+        self.assertEqual(Decimal(response.data['pending_approval']), Decimal('0'))
+    
+    def test_summary_date_range(self):
+        """Dates are parsed up front; the default period is the current local month"""
+        self.client.force_authenticate(user=self.consultant)
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                '/api/commissions/summary/', {'start_date': '2026-01-01', 'end_date': 'soon'}
+            )
+        self.assertEqual(response.status_code, 400)
+        
+        today = timezone.localdate()
+        period = self.client.get('/api/commissions/summary/').data['period']
+        self.assertEqual(period, {
+            'start_date': str(today.replace(day=1)), 'end_date': str(today)
+        })
+    
+    def test_list_pagination_uses_paginator(self):
+        """Page size is capped, links are built, bad page numbers are a 404"""
+        self._add_override(1)
+        self.client.force_authenticate(user=self.consultant)
+        
+        response = self.client.get('/api/commissions/my-commissions/', {'page_size': 1})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIn('page=2', response.data['next'])
+        self.assertIsNone(response.data['previous'])
+        
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/commissions/', {'page_size': 1000})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(self.client.get('/api/commissions/', {'page': 'x'}).status_code, 404)
+    
+    def test_estimated_count_only_for_unfiltered_postgres_querysets(self):
+        """Filtered querysets and other databases always get an exact count"""
+        from commissions.views import estimated_count
+        
+        with self.assertNumQueries(0):
+            self.assertIsNone(estimated_count(Commission.objects.filter(state='paid')))
+            if connection.vendor != 'postgresql':
+                self.assertIsNone(estimated_count(Commission.objects.all()))
+        
+        self.client.force_authenticate(user=self.admin)
+        self.assertEqual(self.client.get('/api/commissions/').data['count'], 1)
+    
+    def test_detail_and_history_query_counts(self):
+        """Detail: row with users, nested history, overrides; history: row and adjustments"""
+        self._add_override(1)
+        self.client.force_authenticate(user=self.consultant)
+        
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/commissions/{self.base.pk}/')
+        self.assertEqual(len(response.data['related_commissions']), 1)
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/commissions/{self.base.pk}/history/')
+        self.assertEqual(response.status_code, 200)
+        
+        self.client.force_authenticate(user=self.manager)
+        self.assertEqual(self.client.get(f'/api/commissions/{self.base.pk}/history/').status_code, 403)
+    
+    def test_history_net_amount_counts_approved_and_paid_adjustments(self):
+        """Net amount is summed from the adjustment rows the response already lists"""
+        for i, (state, amount) in enumerate([('approved', '-5.00'), ('paid', '2.50'), ('draft', '-100.00')]):
+            Commission.objects.create(
+                commission_type='adjustment', consultant=self.consultant, state=state,
+                transaction_date=date(2026, 1, 20), sale_amount=Decimal('0.00'),
+                commission_rate=Decimal('0.00'), calculated_amount=Decimal(amount),
+                reference_number=f'TEST-LIST-001-ADJ-{i}', adjustment_for=self.base,
+                paid_at=timezone.now() if state == 'paid' else None
+            )
+        self.client.force_authenticate(user=self.consultant)
+        
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/commissions/{self.base.pk}/history/')
+        self.assertEqual(len(response.data['adjustments']), 3)
+        self.assertEqual(Decimal(response.data['net_amount']), Decimal('47.50'))
+    
+    def test_payslips_group_paid_rows_by_paid_month(self):
+        """Payslip months come from paid_at"""
+        Commission.objects.filter(pk=self.base.pk).update(
+            state='paid', paid_at=timezone.make_aware(datetime(2026, 2, 3))
+        )
+        self.client.force_authenticate(user=self.consultant)
+        
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/commissions/my-payslips/')
+        self.assertEqual([row['month_id'] for row in response.data], ['2026-02'])
+        self.assertEqual(Decimal(response.data[0]['amount']), Decimal('50.00'))
+        self.assertEqual(response.data[0]['count'], 1)
+    
+    def test_owner_permission_needs_no_queries(self):
+        """Ownership is decided on consultant_id without loading the user"""
+        from types import SimpleNamespace
+        from commissions.views import IsOwnerOrAdmin
+        commission = Commission.objects.get(pk=self.base.pk)
+        permission = IsOwnerOrAdmin()
+        
+        with self.assertNumQueries(0):
+            self.assertTrue(permission.has_object_permission(SimpleNamespace(user=self.consultant), None, commission))
+            self.assertFalse(permission.has_object_permission(SimpleNamespace(user=self.manager), None, commission))
+            self.assertTrue(permission.has_object_permission(SimpleNamespace(user=self.admin), None, commission))
@@ -1,7 +1,10 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from decimal import Decimal
 from commissions.models import Commission, CommissionApproval, ApprovalHistory
@@ -11,21 +14,20 @@ from commissions.approvals.services import (
     ApprovalPaymentService,
     ApprovalError
 )
+from commissions.test_utils import CommissionUsersMixin, create_test_users
+from hierarchy.models import ReportingLine
 
 User = get_user_model()
 
-class ApprovalWorkflowTests(APITestCase):
+
+class ApprovalWorkflowTests(CommissionUsersMixin, APITestCase):
     def setUp(self):
-        # Create users
-        self.admin = User.objects.create_superuser(username='admin', password='password123', email='admin@test.com')
-        self.consultant = User.objects.create_user(username='consultant', password='password123')
-        self.manager = User.objects.create_user(username='manager', password='password123')
-        
         # Add manager to a group if needed, or just use is_staff for simplicity in some tests
         # For our service logic, we check is_staff or 'Admins' group.
         
-        # Create a commission in Draft state
-        self.commission = Commission.objects.create(
+        # Create a commission in Draft state (base commissions carry no manager,
+        # so the manager is the assigned approver instead)
+        commission = Commission.objects.create(
             commission_type='base',
             consultant=self.consultant,
             transaction_date=timezone.now().date(),
@@ -36,33 +38,52 @@ class ApprovalWorkflowTests(APITestCase):
             state='draft',
             created_by=self.admin
         )
+        CommissionApproval.objects.filter(commission=commission).update(assigned_approver=self.manager)
+        self.commission = self._reload(commission)
+
+    def _reload(self, commission):
+        """Fresh copy of a commission with its approval record and users in one query"""
+        return Commission.objects.select_related(
+            'approval', 'approval__assigned_approver', 'consultant', 'manager'
+        ).get(pk=commission.pk)
 
     def test_01_submit_workflow(self):
-        """Test submitting a commission moves state and captures approver"""
-        # Set a manager for the consultant in Phase 1 sense (mocking it by setting commission.manager or similar)
-        # Actually our service uses commission.manager if assigned_approver is null
-        self.commission.manager = self.manager
-        self.commission.save()
-        
+        """Test submitting a commission moves state and keeps the assigned approver"""
         ApprovalSubmissionService.submit(self.commission, self.consultant)
         
-        self.commission.refresh_from_db()
-        self.assertEqual(self.commission.state, 'submitted')
-        
-        approval = self.commission.approval
-        self.assertEqual(approval.assigned_approver, self.manager)
+        with self.assertNumQueries(1):
+            self.commission = self._reload(self.commission)
+            approval = self.commission.approval
+            self.assertEqual(self.commission.state, 'submitted')
+            self.assertEqual(approval.assigned_approver, self.manager)
         
         # Check history
-        history = ApprovalHistory.objects.filter(approval_record=approval, action='SUBMIT').first()
-        self.assertIsNotNone(history)
-        self.assertEqual(history.from_state, 'draft')
-        self.assertEqual(history.to_state, 'submitted')
-        self.assertEqual(history.actor, self.consultant)
+        with self.assertNumQueries(1):
+            history = ApprovalHistory.objects.select_related('actor').filter(
+                approval_record=approval, action='SUBMIT'
+            ).first()
+            self.assertIsNotNone(history)
+            self.assertEqual(history.from_state, 'draft')
+            self.assertEqual(history.to_state, 'submitted')
+            self.assertEqual(history.actor, self.consultant)
+
+    def test_stale_instance_cannot_repeat_a_decision(self):
+        """The UPDATE checks the prior state, so a concurrent second approval fails"""
+        ApprovalSubmissionService.submit(self.commission, self.consultant)
+        stale = self._reload(self.commission)
+        ApprovalDecisionService.approve(self.commission, self.manager)
+        
+        with self.assertRaises(ApprovalError):
+            ApprovalDecisionService.reject(stale, self.admin, 'Too late')
+        self.commission.refresh_from_db()
+        self.assertEqual(self.commission.state, 'approved')
+        self.assertEqual(
+            list(self.commission.approval.history.values_list('action', flat=True)),
+            ['SUBMIT', 'APPROVE']
+        )
 
     def test_02_approve_workflow_permission(self):
         """Only assigned approver or admin can approve"""
-        self.commission.manager = self.manager
-        self.commission.save()
         ApprovalSubmissionService.submit(self.commission, self.consultant)
         
         # Consultant tries to approve own
@@ -76,27 +97,24 @@ class ApprovalWorkflowTests(APITestCase):
             
         # Manager approves
         ApprovalDecisionService.approve(self.commission, self.manager)
-        self.commission.refresh_from_db()
+        with self.assertNumQueries(1):
+            self.commission = self._reload(self.commission)
         self.assertEqual(self.commission.state, 'approved')
-        self.assertEqual(self.commission.approved_by, self.manager)
+        self.assertEqual(self.commission.approved_by_id, self.manager.id)
 
     def test_03_reject_requires_reason(self):
         """Rejection must have a reason"""
-        self.commission.manager = self.manager
-        self.commission.save()
         ApprovalSubmissionService.submit(self.commission, self.consultant)
         
         with self.assertRaises(ApprovalError):
             ApprovalDecisionService.reject(self.commission, self.manager, "")
             
         ApprovalDecisionService.reject(self.commission, self.manager, "Missing docs")
-        self.commission.refresh_from_db()
+        self.commission = self._reload(self.commission)
         self.assertEqual(self.commission.state, 'rejected')
 
     def test_04_payment_admin_only(self):
         """Only admin can mark as paid"""
-        self.commission.manager = self.manager
-        self.commission.save()
         ApprovalSubmissionService.submit(self.commission, self.consultant)
         ApprovalDecisionService.approve(self.commission, self.manager)
         
@@ -106,7 +124,7 @@ class ApprovalWorkflowTests(APITestCase):
             
         # Admin pays
         ApprovalPaymentService.mark_as_paid(self.commission, self.admin)
-        self.commission.refresh_from_db()
+        self.commission = self._reload(self.commission)
         self.assertEqual(self.commission.state, 'paid')
         self.assertIsNotNone(self.commission.paid_at)
 
@@ -124,8 +142,6 @@ class ApprovalWorkflowTests(APITestCase):
         """Overrides should inherit approval from base"""
         # Create base + override
         base = self.commission
-        base.manager = self.manager
-        base.save()
         
         override = Commission.objects.create(
             commission_type='override',
@@ -145,23 +161,23 @@ class ApprovalWorkflowTests(APITestCase):
         ApprovalSubmissionService.submit(override, self.consultant)
         
         # Approve base
-        ApprovalDecisionService.approve(base, self.manager)
+        # Permissions (group check, authz), base UPDATE + history, then the
+        # cascade's lock, UPDATE and history INSERT, inside one savepoint
+        with self.assertNumQueries(9):
+            ApprovalDecisionService.approve(base, self.manager)
         
-        base.refresh_from_db()
-        override.refresh_from_db()
+        base = self._reload(base)
+        override = self._reload(override)
         
         self.assertEqual(base.state, 'approved')
         self.assertEqual(override.state, 'approved')
         
-        # Check override history notes
-        hist = ApprovalHistory.objects.filter(approval_record__commission=override, action='APPROVE').first()
+        # Check override history notes (approval record already loaded)
+        hist = ApprovalHistory.objects.filter(approval_record=override.approval, action='APPROVE').first()
         self.assertIn("Auto-approved", hist.notes)
 
     def test_07_resubmit_from_rejected(self):
         """Can resubmit after a rejection"""
-        self.commission.manager = self.manager
-        self.commission.save()
-        
         ApprovalSubmissionService.submit(self.commission, self.consultant)
         ApprovalDecisionService.reject(self.commission, self.manager, "Fixed it")
         
@@ -170,54 +186,450 @@ class ApprovalWorkflowTests(APITestCase):
         # Resubmit
         ApprovalSubmissionService.submit(self.commission, self.consultant)
         self.assertEqual(self.commission.state, 'submitted')
+        self.assertEqual(self._reload(self.commission).state, 'submitted')
+
+
+class AdminCheckTests(TestCase):
+    def test_group_admin_check_is_memoized(self):
+        """The 'Admins' group lookup runs once per user instance"""
+        from django.contrib.auth.models import Group
+        from commissions.approvals.permissions import is_admin_user
+
+        user = User.objects.create_user(username='groupadmin', password='password123')
+        user.groups.add(Group.objects.create(name='Admins'))
+
+        with self.assertNumQueries(1):
+            self.assertTrue(is_admin_user(user))
+            self.assertTrue(is_admin_user(user))
+
+    def test_staff_skips_group_query(self):
+        from commissions.approvals.permissions import is_admin_user
+
+        staff = User.objects.create_user(username='staff', password='password123', is_staff=True)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_admin_user(staff))
+
+
+class DecisionPermissionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.consultant, cls.approver = create_test_users(consultant={}, approver={})
 
-class ApprovalAPITests(APITestCase):
     def setUp(self):
-        self.admin = User.objects.create_superuser(username='admin', password='password123', email='admin@test.com')
-        self.consultant = User.objects.create_user(username='consultant', password='password123')
-        self.manager = User.objects.create_user(username='manager', password='password123')
-        
         self.commission = Commission.objects.create(
             commission_type='base',
             consultant=self.consultant,
+            transaction_date=timezone.now().date(),
+            sale_amount=Decimal('1000.00'),
+            commission_rate=Decimal('10.00'),
+            calculated_amount=Decimal('100.00'),
+            reference_number='PERM-001',
+            state='submitted'
+        )
+        CommissionApproval.objects.filter(commission=self.commission).update(assigned_approver=self.approver)
+
+    def test_permissions_resolved_in_one_query(self):
+        """Group check plus one annotated query, whatever the outcome"""
+        with self.assertNumQueries(2):
+            perms = ApprovalDecisionService._get_permissions(self.commission, self.approver)
+        self.assertTrue(perms['is_assigned_approver'])
+        self.assertFalse(perms['is_hierarchy_manager'])
+
+    def test_explicit_manager_needs_no_queries(self):
+        override = Commission(pk=self.commission.pk, consultant=self.consultant, manager=self.approver)
+        with self.assertNumQueries(0):
+            perms = ApprovalDecisionService._get_permissions(override, self.approver)
+        self.assertTrue(perms['is_explicit_manager'])
+
+    def test_admin_skips_relationship_query(self):
+        staff = User.objects.create_user(username='staffer', password='password123', is_staff=True)
+        with self.assertNumQueries(0):
+            perms = ApprovalDecisionService._get_permissions(self.commission, staff)
+        self.assertTrue(perms['is_admin'])
+
+    def test_paid_commission_cannot_change_state(self):
+        """record_action refuses to move a paid commission"""
+        from commissions.approvals.services import ApprovalStateService
+
+        Commission.objects.filter(pk=self.commission.pk).update(state='paid', paid_at=timezone.now())
+        with self.assertRaises(ApprovalError):
+            ApprovalStateService.record_action(self.commission, 'APPROVE', self.approver, 'approved')
+        self.commission.refresh_from_db()
+        self.assertEqual(self.commission.state, 'paid')
+
+    def test_record_action_is_a_single_update(self):
+        """No re-read of the row before the state change"""
+        from commissions.approvals.services import ApprovalStateService
+
+        # SAVEPOINT, UPDATE, history INSERT, RELEASE; the approval record is cached
+        with self.assertNumQueries(4):
+            ApprovalStateService.record_action(self.commission, 'APPROVE', self.approver, 'approved')
+        self.commission.refresh_from_db()
+        self.assertEqual(self.commission.state, 'approved')
+        self.assertEqual(self.commission.approved_by, self.approver)
+
+    def test_approval_record_created_with_commission(self):
+        self.assertTrue(CommissionApproval.objects.filter(commission=self.commission).exists())
+
+    def test_timeline_loads_actors_in_one_query(self):
+        approval = self.commission.approval
+        for action in ('SUBMIT', 'REJECT', 'SUBMIT'):
+            actor = User.objects.create_user(username=f'actor-{approval.history.count()}', password='password123')
+            ApprovalHistory.objects.create(
+                approval_record=approval, action=action, actor=actor,
+                from_state='draft', to_state='submitted'
+            )
+        client = APIClient()
+        client.force_authenticate(user=self.consultant)
+
+        # commission + approval, history with actors
+        with self.assertNumQueries(2):
+            response = client.get(f'/api/commissions/{self.commission.pk}/timeline/')
+
+        self.assertEqual([h['action'] for h in response.data], ['SUBMIT', 'REJECT', 'SUBMIT'])
+        self.assertEqual(response.data[1]['actor']['username'], 'actor-1')
+
+    def test_approval_detail_loads_in_two_queries(self):
+        approval = self.commission.approval
+        for action in ('SUBMIT', 'REJECT'):
+            ApprovalHistory.objects.create(
+                approval_record=approval, action=action, actor=self.consultant,
+                from_state='draft', to_state='submitted'
+            )
+        client = APIClient()
+        client.force_authenticate(user=self.approver)
+
+        # commission + approval + approver, history with actors
+        with self.assertNumQueries(2):
+            response = client.get(f'/api/commissions/{self.commission.pk}/approval/')
+
+        self.assertEqual(response.data['assigned_approver']['username'], 'approver')
+        self.assertEqual([h['action'] for h in response.data['history']], ['SUBMIT', 'REJECT'])
+
+    def test_unrelated_user_cannot_reject(self):
+        outsider = User.objects.create_user(username='outsider', password='password123')
+        with self.assertRaises(ApprovalError):
+            ApprovalDecisionService.reject(self.commission, outsider, "Not mine to reject")
+
+
+class CascadeApprovalTests(CommissionUsersMixin, TestCase):
+    def setUp(self):
+        self.base = Commission.objects.create(
+            commission_type='base',
+            consultant=self.consultant,
+            transaction_date=timezone.now().date(),
+            sale_amount=Decimal('1000.00'),
+            commission_rate=Decimal('10.00'),
+            calculated_amount=Decimal('100.00'),
+            reference_number='BASE-001',
+            state='submitted',
+            created_by=self.admin
+        )
+        CommissionApproval.objects.filter(commission=self.base).update(assigned_approver=self.manager)
+
+    def _override(self, level, state='submitted'):
+        return Commission.objects.create(
+            commission_type='override',
+            consultant=self.consultant,
             manager=self.manager,
             transaction_date=timezone.now().date(),
             sale_amount=Decimal('1000.00'),
+            commission_rate=Decimal('2.00'),
+            calculated_amount=Decimal('20.00'),
+            reference_number=f'BASE-001-OVR-L{level}',
+            override_level=level,
+            state=state,
+            parent_commission=self.base
+        )
+
+    def test_cascade_approves_submitted_overrides(self):
+        """Submitted overrides are approved with history; others are left alone"""
+        with_record = self._override(1)
+        without_record = self._override(2)
+        CommissionApproval.objects.filter(commission=without_record).delete()
+        draft = self._override(3, state='draft')
+
+        ApprovalDecisionService.approve(self.base, self.manager)
+
+        for ovr in (with_record, without_record):
+            ovr.refresh_from_db()
+            self.assertEqual(ovr.state, 'approved')
+            self.assertEqual(ovr.approved_by, self.manager)
+            self.assertIsNotNone(ovr.approved_at)
+            hist = ovr.approval.history.get(action='APPROVE')
+            self.assertEqual(hist.from_state, 'submitted')
+            self.assertIn("Auto-approved via base BASE-001", hist.notes)
+
+        draft.refresh_from_db()
+        self.assertEqual(draft.state, 'draft')
+
+    def test_cascade_query_count_is_constant(self):
+        """Approving a base costs the same number of queries for 1 or 5 overrides"""
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                ApprovalDecisionService._cascade_approve(self.base, self.manager)
+            return len(ctx.captured_queries)
+
+        self._override(1)
+        single = count_queries()
+        for level in range(2, 7):
+            self._override(level)
+        self.assertEqual(count_queries(), single)
+
+    def test_cascade_writes_history_in_one_insert(self):
+        """Lock with approval ids, one UPDATE, one history INSERT when records exist"""
+        for level in range(1, 4):
+            self._override(level)
+        with self.assertNumQueries(3):
+            approved = ApprovalDecisionService._cascade_approve(self.base, self.manager)
+        self.assertEqual(len(approved), 3)
+        self.assertEqual(
+            ApprovalHistory.objects.filter(approval_record__commission__parent_commission=self.base).count(), 3
+        )
+
+
+    def test_approval_notifications_sent_after_commit(self):
+        """Notifications for the base and its overrides go out once committed"""
+        from notifications.models import NotificationLog
+        override = self._override(1)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            ApprovalDecisionService.approve(self.base, self.manager)
+            self.assertEqual(NotificationLog.objects.count(), 0)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            set(NotificationLog.objects.values_list('source_id', flat=True)),
+            {self.base.id, override.id}
+        )
+
+    def test_failed_rejection_sends_nothing(self):
+        """A rejection rolled back by the paid guard schedules no notification"""
+        Commission.objects.filter(pk=self.base.pk).update(state='paid', paid_at=timezone.now())
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(ApprovalError):
+                ApprovalDecisionService.reject(self.base, self.admin, 'Incorrect amount')
+        self.assertEqual(callbacks, [])
+
+
+class PendingApprovalsQueryTests(CommissionUsersMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _submit_commission(self, index):
+        consultant = User.objects.create_user(username=f'consultant{index}', password='password123')
+        commission = Commission.objects.create(
+            commission_type='base',
+            consultant=consultant,
+            transaction_date=timezone.now().date(),
+            sale_amount=Decimal('1000.00'),
+            commission_rate=Decimal('10.00'),
+            calculated_amount=Decimal('100.00'),
+            reference_number=f'PENDING-{index:03d}',
+            state='submitted',
+            created_by=self.admin
+        )
+        approval = commission.approval
+        approval.assigned_approver = self.manager
+        approval.save()
+        ApprovalHistory.objects.create(
+            approval_record=approval, action='SUBMIT', actor=consultant,
+            from_state='draft', to_state='submitted'
+        )
+
+    def test_pending_list_query_count_is_constant(self):
+        """Listing cost does not grow with the number of pending commissions"""
+        self.client.force_authenticate(user=self.admin)
+        url = '/api/commissions/approvals/pending/'
+
+        # freshness aggregate, COUNT, page SELECT, history prefetch
+        self._submit_commission(1)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 1)
+
+        for i in range(2, 6):
+            self._submit_commission(i)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(response.data['results'][0]['approval']['history'][0]['action'], 'SUBMIT')
+
+    def test_pending_list_is_paginated(self):
+        for i in range(1, 4):
+            self._submit_commission(i)
+        self.client.force_authenticate(user=self.admin)
+
+        response = self.client.get('/api/commissions/approvals/pending/', {'page_size': 2})
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_manager_sees_team_via_subquery(self):
+        """Team members are matched with a subquery, not a pre-fetched id list"""
+        from hierarchy.models import ReportingLine
+
+        team_manager = User.objects.create_user(username='teamlead', password='password123')
+        self._submit_commission(1)
+        ReportingLine.objects.create(
+            consultant=User.objects.get(username='consultant1'),
+            manager=team_manager,
+            start_date=timezone.now().date()
+        )
+        self._submit_commission(2)
+        self.client.force_authenticate(user=team_manager)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/commissions/approvals/pending/')
+
+        self.assertEqual([r['reference_number'] for r in response.data['results']], ['PENDING-001'])
+        self.assertFalse(any(
+            q['sql'].startswith('SELECT') and 'FROM "hierarchy_reporting_line"' in q['sql'].split('WHERE')[0]
+            for q in ctx.captured_queries
+        ))
+
+    def test_manager_listing_has_no_duplicates_without_distinct(self):
+        """A commission matching every clause is listed once"""
+        from hierarchy.models import ReportingLine
+
+        self._submit_commission(1)
+        consultant = User.objects.get(username='consultant1')
+        ReportingLine.objects.create(consultant=consultant, manager=self.manager, start_date=timezone.now().date())
+        override = Commission.objects.create(
+            commission_type='override',
+            consultant=consultant,
+            manager=self.manager,
+            transaction_date=timezone.now().date(),
+            sale_amount=Decimal('1000.00'),
+            commission_rate=Decimal('2.00'),
+            calculated_amount=Decimal('20.00'),
+            reference_number='PENDING-001-OVR',
+            state='submitted'
+        )
+        CommissionApproval.objects.filter(commission=override).update(assigned_approver=self.manager)
+        self.client.force_authenticate(user=self.manager)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/commissions/approvals/pending/')
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len({r['id'] for r in response.data['results']}), 2)
+        self.assertFalse(any('DISTINCT' in q['sql'] for q in ctx.captured_queries))
+
+    def test_unchanged_listing_served_from_cache(self):
+        self._submit_commission(1)
+        self.client.force_authenticate(user=self.admin)
+        url = '/api/commissions/approvals/pending/'
+
+        first = self.client.get(url)
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+        self.assertEqual(first.data, second.data)
+
+    def test_transition_refreshes_cached_listing(self):
+        self._submit_commission(1)
+        self.client.force_authenticate(user=self.admin)
+        url = '/api/commissions/approvals/pending/'
+        self.assertEqual(self.client.get(url).data['count'], 1)
+
+        commission = Commission.objects.get(reference_number='PENDING-001')
+        ApprovalDecisionService.approve(commission, self.admin)
+
+        self.assertEqual(self.client.get(url).data['count'], 0)
+
+    def test_reassignment_refreshes_cached_listing(self):
+        """A new approver changes the page without touching the commission row"""
+        self._submit_commission(1)
+        self.client.force_authenticate(user=self.admin)
+        url = '/api/commissions/approvals/pending/'
+        first = self.client.get(url).data['results'][0]
+        self.assertEqual(first['approval']['assigned_approver']['id'], self.manager.id)
+
+        approval = CommissionApproval.objects.get(commission_id=first['id'])
+        approval.assigned_approver = self.admin
+        approval.save()
+
+        result = self.client.get(url).data['results'][0]
+        self.assertEqual(result['approval']['assigned_approver']['id'], self.admin.id)
+
+    def test_admin_skips_hierarchy_lookup(self):
+        """Admins take the unscoped path and never query reporting lines"""
+        self._submit_commission(1)
+        self.client.force_authenticate(user=self.admin)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/commissions/approvals/pending/', {'status': 'all'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(ctx.captured_queries), 4)
+        self.assertFalse(any('hierarchy_' in q['sql'] for q in ctx.captured_queries))
+
+
+class ApprovalAPITests(CommissionUsersMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Base commissions carry no manager; the approver is the consultant's line manager
+        ReportingLine.objects.create(
+            consultant=cls.consultant,
+            manager=cls.manager,
+            start_date=timezone.now().date(),
+            is_active=True
+        )
+
+    def setUp(self):
+        self.commission = Commission.objects.create(
+            commission_type='base',
+            consultant=self.consultant,
+            transaction_date=timezone.now().date(),
+            sale_amount=Decimal('1000.00'),
             commission_rate=Decimal('10.00'),
             calculated_amount=Decimal('100.00'),
             reference_number='API-TEST-001',
             state='draft'
         )
-        
+        # One pre-authenticated client per actor instead of re-authenticating self.client
+        self.consultant_client = self._client_for(self.consultant)
+        self.manager_client = self._client_for(self.manager)
+        self.admin_client = self._client_for(self.admin)
+
+    def _client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
     def test_api_workflow_end_to_end(self):
         """Full API flow: Submit -> Approve -> Paid"""
         # 1. Login as consultant and submit
-        self.client.force_authenticate(user=self.consultant)
         url = f'/api/commissions/{self.commission.id}/submit/'
-        response = self.client.post(url, {"notes": "Please check"})
+        response = self.consultant_client.post(url, {"notes": "Please check"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # 2. Login as manager and check pending
-        self.client.force_authenticate(user=self.manager)
         pending_url = '/api/commissions/approvals/pending/'
-        response = self.client.get(pending_url)
-        self.assertEqual(len(response.data), 1)
-        self.assertEqual(response.data[0]['id'], self.commission.id)
+        cache.clear()
+        # Group check, freshness aggregate, count, page rows, history prefetch
+        with self.assertNumQueries(5):
+            response = self.manager_client.get(pending_url)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['id'], self.commission.id)
         
         # 3. Manager approves
         approve_url = f'/api/commissions/{self.commission.id}/approve/'
-        response = self.client.post(approve_url, {"notes": "Looks good"})
+        response = self.manager_client.post(approve_url, {"notes": "Looks good"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # 4. Admin marks as paid
-        self.client.force_authenticate(user=self.admin)
         pay_url = f'/api/commissions/{self.commission.id}/mark-paid/'
-        response = self.client.post(pay_url)
+        response = self.admin_client.post(pay_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # 5. Check timeline
         timeline_url = f'/api/commissions/{self.commission.id}/timeline/'
-        response = self.client.get(timeline_url)
+        # Commission with its approval, then history with actors
+        with self.assertNumQueries(2):
+            response = self.admin_client.get(timeline_url)
         self.assertEqual(len(response.data), 3) # Submit, Approve, Paid
         self.assertEqual(response.data[0]['action'], 'SUBMIT')
         self.assertEqual(response.data[1]['action'], 'APPROVE')
@@ -225,11 +637,10 @@ class ApprovalAPITests(APITestCase):
 
     def test_api_rejection_validation(self):
         """API Rejection requires reason"""
-        self.client.force_authenticate(user=self.consultant)
-        self.client.post(f'/api/commissions/{self.commission.id}/submit/')
+        self.consultant_client.post(f'/api/commissions/{self.commission.id}/submit/')
         
-        self.client.force_authenticate(user=self.manager)
         url = f'/api/commissions/{self.commission.id}/reject/'
-        response = self.client.post(url, {"rejection_reason": ""})
+        response = self.manager_client.post(url, {"rejection_reason": ""})
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn("rejection_reason", response.data)
+        # Validation errors come wrapped in the global {error, message, details} envelope
+        self.assertIn("rejection_reason", response.data['details'])
@@ -5,12 +5,20 @@ Implements REST endpoints as specified in Phase 2 API Design.
 All business logic delegated to services layer.
 """
 
+from datetime import datetime
+from decimal import Decimal
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.contrib.auth import get_user_model
+from django.core.paginator import Paginator
+from django.db import connections
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.db.models import Sum, Count, Q
 from django.core.exceptions import ValidationError as DjangoValidationError
 
@@ -19,7 +27,6 @@ from .serializers import (
     CommissionCreateSerializer,
     CommissionReadSerializer,
     CommissionListSerializer,
-    CommissionSummarySerializer,
     CommissionAdjustmentSerializer,
     StateTransitionSerializer,
     BulkCommissionCreateSerializer,
@@ -33,14 +40,63 @@ from .services import (
 User = get_user_model()
 
 
+def _is_owner_or_admin(request, commission):
+    """Staff or the commission's consultant (compared by id, so no user row is loaded)."""
+    return request.user.is_staff or commission.consultant_id == request.user.id
+
+
 class IsOwnerOrAdmin(IsAuthenticated):
     """
     Permission: User can access own commissions or admin can access any.
     """
     def has_object_permission(self, request, view, obj):
-        if request.user.is_staff:
-            return True
-        return obj.consultant == request.user
+        return _is_owner_or_admin(request, obj)
+
+
+class CommissionListPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+# Below this many rows an exact COUNT(*) is cheap and the planner estimate is least reliable
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimated_count(queryset):
+    """
+    PostgreSQL's planner estimate of an unfiltered queryset's row count.
+    
+    Returns None when no estimate applies (filtered queryset, other database
+    or a table never analyzed), in which case callers count exactly.
+    """
+    db = connections[queryset.db]
+    if queryset.query.where or db.vendor != 'postgresql':
+        return None
+    with db.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator reporting the planner estimate for large unfiltered querysets."""
+    
+    @cached_property
+    def count(self):
+        if hasattr(self.object_list, 'query'):
+            estimate = estimated_count(self.object_list)
+            if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class AdminCommissionListPagination(CommissionListPagination):
+    """Admin list: an approximate total is fine, so skip COUNT(*) over the whole table."""
+    django_paginator_class = EstimatedCountPaginator
 
 
 @api_view(['POST'])
@@ -81,10 +137,13 @@ def create_commission(request):
             client_name=serializer.validated_data.get('client_name', '')
         )
         
-        # Serialize response
-        base_commission_data = CommissionReadSerializer(result['base_commission']).data
+        # Serialize response (re-read in one query with everything the serializer renders)
+        created = CommissionReadSerializer.prefetch_queryset(Commission.objects.filter(
+            pk__in=[result['base_commission'].pk] + [c.pk for c in result['override_commissions']]
+        )).in_bulk()
+        base_commission_data = CommissionReadSerializer(created[result['base_commission'].pk]).data
         override_commissions_data = CommissionReadSerializer(
-            result['override_commissions'], many=True
+            [created[c.pk] for c in result['override_commissions']], many=True
         ).data
         
         response_data = {
@@ -96,6 +155,9 @@ def create_commission(request):
         return Response(response_data, status=status.HTTP_201_CREATED)
         
     except DjangoValidationError as e:
+        if hasattr(e, 'error_dict'):
+            # Field errors (e.g. a duplicate reference) keep the serializer error shape
+            return Response(e.message_dict, status=status.HTTP_400_BAD_REQUEST)
         return Response(
             {"detail": str(e)},
             status=status.HTTP_400_BAD_REQUEST
@@ -109,6 +171,9 @@ def bulk_create_commissions(request):
     POST /api/commissions/bulk-create/
     
     Admin-only bulk creation of commissions.
+    
+    The batch is all or nothing: invalid rows are reported per row with a 400
+    and nothing is written, otherwise every row is created and returned.
     """
     serializer = BulkCommissionCreateSerializer(data=request.data)
     
@@ -117,45 +182,43 @@ def bulk_create_commissions(request):
     
     commissions_data = serializer.validated_data['commissions']
     
-    results = []
-    created_count = 0
-    failed_count = 0
+    # Consultants were checked by the serializer; load them all at once
+    consultants = User.objects.in_bulk({comm_data['consultant_id'] for comm_data in commissions_data})
+    rows = [
+        {
+            'consultant': consultants[comm_data['consultant_id']],
+            'transaction_date': comm_data['transaction_date'],
+            'sale_amount': comm_data['sale_amount'],
+            'gst_rate': comm_data['gst_rate'],
+            'commission_rate': comm_data['commission_rate'],
+            'reference_number': comm_data['reference_number'],
+            'notes': comm_data.get('notes', ''),
+            'client_name': comm_data.get('client_name', ''),
+        }
+        for comm_data in commissions_data
+    ]
     
-    for comm_data in commissions_data:
-        try:
-            consultant = get_object_or_404(User, id=comm_data['consultant_id'])
-            
-            result = CommissionCreationService.create_base_commission_with_overrides(
-                consultant=consultant,
-                transaction_date=comm_data['transaction_date'],
-                sale_amount=comm_data['sale_amount'],
-                gst_rate=comm_data['gst_rate'],
-                commission_rate=comm_data['commission_rate'],
-                reference_number=comm_data['reference_number'],
-                notes=comm_data.get('notes', ''),
-                created_by=request.user,
-                client_name=comm_data.get('client_name', '')
-            )
-            
-            results.append({
-                "reference_number": comm_data['reference_number'],
-                "status": "success",
-                "base_commission_id": result['base_commission'].id,
-                "override_count": len(result['override_commissions'])
-            })
-            created_count += result['total_created']
-            
-        except Exception as e:
-            results.append({
-                "reference_number": comm_data['reference_number'],
-                "status": "failed",
-                "error": str(e)
-            })
-            failed_count += 1
+    # The whole payload is written in one transaction with multi-row INSERTs
+    try:
+        created = CommissionCreationService.create_many_with_overrides(rows, created_by=request.user)
+    except DjangoValidationError as e:
+        if hasattr(e, 'error_dict'):
+            return Response(e.message_dict, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    results = [
+        {
+            "reference_number": result['base_commission'].reference_number,
+            "status": "success",
+            "base_commission_id": result['base_commission'].id,
+            "override_count": len(result['override_commissions'])
+        }
+        for result in created
+    ]
     
     return Response({
-        "created": created_count,
-        "failed": failed_count,
+        "created": sum(result['total_created'] for result in created),
+        "failed": 0,  # Rows are validated up front; the batch is all or nothing
         "results": results
     }, status=status.HTTP_201_CREATED)
 
@@ -169,9 +232,9 @@ def my_commissions(request):
     List all commissions for the authenticated user.
     """
     # Filter by user
-    queryset = Commission.objects.filter(
+    queryset = CommissionListSerializer.prefetch_queryset(Commission.objects.filter(
         Q(consultant=request.user) | Q(manager=request.user)
-    ).select_related('consultant', 'manager', 'created_by', 'approved_by')
+    ))
     
     # Apply filters from query params
     state = request.query_params.get('state')
@@ -190,24 +253,13 @@ def my_commissions(request):
     if end_date:
         queryset = queryset.filter(transaction_date__lte=end_date)
     
-    # Pagination (simple implementation)
-    page_size = int(request.query_params.get('page_size', 20))
-    page = int(request.query_params.get('page', 1))
-    
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    
-    total_count = queryset.count()
-    paginated_queryset = queryset[start_index:end_index]
+    # Pagination (the prefetches only run for the page's rows)
+    paginator = CommissionListPagination()
+    page = paginator.paginate_queryset(queryset, request)
     
-    serializer = CommissionListSerializer(paginated_queryset, many=True)
+    serializer = CommissionListSerializer(page, many=True, context={'request': request})
     
-    return Response({
-        "count": total_count,
-        "next": f"?page={page + 1}" if end_index < total_count else None,
-        "previous": f"?page={page - 1}" if page > 1 else None,
-        "results": serializer.data
-    })
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
@@ -218,12 +270,24 @@ def my_team_commissions(request):
     
     Manager views their team's commission summaries.
     """
-    # Check if user is a manager (has team members)
     from hierarchy.models import ReportingLine
     
-    is_manager = ReportingLine.objects.filter(
+    # Team members with their usernames and commission metrics in one grouped
+    # LEFT JOIN (one active line per consultant, so the join cannot double count);
+    # a non-empty team is also what makes the user a manager
+    earned = 'consultant__commissions_earned'
+    base = Q(**{f'{earned}__commission_type': 'base'})
+    pending = base & Q(**{f'{earned}__state': 'submitted'})
+    team = list(ReportingLine.objects.filter(
         manager=request.user, is_active=True
-    ).exists()
+    ).order_by('-start_date').values('consultant_id', 'consultant__username').annotate(
+        total_sales_volume=Sum(f'{earned}__sale_amount', filter=base),
+        total_commission=Sum(f'{earned}__calculated_amount', filter=base),
+        total_count=Count(earned, filter=base),
+        pending_count=Count(earned, filter=pending),
+        pending_value=Sum(f'{earned}__calculated_amount', filter=pending),
+    ))
+    is_manager = bool(team)
     role = getattr(request.user, 'role', '')
     role_value = role.lower().strip() if isinstance(role, str) else role
     has_manager_access = (
@@ -238,44 +302,21 @@ def my_team_commissions(request):
         # Return empty list instead of error
         return Response([])
     
-    # Get team members
-    team_members = ReportingLine.objects.filter(
-        manager=request.user, is_active=True
-    ).values_list('consultant_id', flat=True)
-    
-    # Aggregate commissions by consultant
-    # Pre-fetch users to avoid N+1
-    user_objects = User.objects.filter(id__in=team_members)
-    users_map = {u.id: u for u in user_objects}
-    
     team_data = []
-    for consultant_id in team_members:
-        # Base query for this consultant
-        commissions = Commission.objects.filter(
-            consultant_id=consultant_id,
-            commission_type='base'
-        )
-        
-        # Calculate stats
-        total_sales_volume = commissions.aggregate(Sum('sale_amount'))['sale_amount__sum'] or 0
-        total_commission = commissions.aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0
-        pending_qs = commissions.filter(state='submitted')
-        pending_count = pending_qs.count()
-        pending_val = pending_qs.aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0
-        
+    for stats in team:
         team_data.append({
             "consultant": {
-                "id": consultant_id,
-                "username": users_map.get(consultant_id).username if consultant_id in users_map else "Unknown"
+                "id": stats['consultant_id'],
+                "username": stats['consultant__username']
             },
             # Metrics
-            "total_sales_volume": str(total_sales_volume),      # Gross Revenue (Policy Value)
-            "total_commission_earned": str(total_commission),   # Actual Earnings
-            "pending_count": pending_count,                     # Number of items to review
-            "pending_value": str(pending_val),                  # Potential earnings pending
+            "total_sales_volume": str(stats['total_sales_volume'] or 0),   # Gross Revenue (Policy Value)
+            "total_commission_earned": str(stats['total_commission'] or 0), # Actual Earnings
+            "pending_count": stats['pending_count'],                         # Number of items to review
+            "pending_value": str(stats['pending_value'] or 0),               # Potential earnings pending
             
             # Legacy/Debug fields (optional)
-            "total_commissions_count": commissions.count(),
+            "total_commissions_count": stats['total_count'],
         })
     
     return Response({
@@ -304,7 +345,6 @@ def my_payslips(request):
     
     # Group by Payment Month (paid_at)
     # If paid_at is null (shouldn't be for paid), fallback to updated_at
-    from django.db.models import F
     from django.db.models.functions import Coalesce
     
     summary = queryset.annotate(
@@ -338,9 +378,7 @@ def all_commissions(request):
     
     Admin view of all commissions with advanced filtering.
     """
-    queryset = Commission.objects.select_related(
-        'consultant', 'manager', 'created_by', 'approved_by'
-    ).all()
+    queryset = CommissionListSerializer.prefetch_queryset(Commission.objects.all())
     
     # Apply filters
     consultant_id = request.query_params.get('consultant_id')
@@ -359,22 +397,13 @@ def all_commissions(request):
     if commission_type:
         queryset = queryset.filter(commission_type=commission_type)
     
-    # Pagination
-    page_size = int(request.query_params.get('page_size', 20))
-    page = int(request.query_params.get('page', 1))
-    
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
+    # Pagination (the prefetches only run for the page's rows)
+    paginator = AdminCommissionListPagination()
+    page = paginator.paginate_queryset(queryset, request)
     
-    total_count = queryset.count()
-    paginated_queryset = queryset[start_index:end_index]
+    serializer = CommissionListSerializer(page, many=True, context={'request': request})
     
-    serializer = CommissionListSerializer(paginated_queryset, many=True)
-    
-    return Response({
-        "count": total_count,
-        "results": serializer.data
-    })
+    return paginator.get_paginated_response(serializer.data)
 
 
 @api_view(['GET'])
@@ -385,10 +414,12 @@ def commission_detail(request, pk):
     
     View full details of a specific commission.
     """
-    commission = get_object_or_404(Commission, pk=pk)
+    commission = get_object_or_404(
+        CommissionReadSerializer.prefetch_queryset(Commission.objects.all()), pk=pk
+    )
     
     # Permission check: owner or admin
-    if not request.user.is_staff and commission.consultant != request.user:
+    if not _is_owner_or_admin(request, commission):
         return Response(
             {"detail": "You do not have permission to view this commission."},
             status=status.HTTP_403_FORBIDDEN
@@ -397,12 +428,12 @@ def commission_detail(request, pk):
     # Get related commissions
     related_commissions = []
     if commission.commission_type == 'base':
-        related_commissions = Commission.objects.filter(
+        related_commissions = CommissionListSerializer.prefetch_queryset(Commission.objects.filter(
             parent_commission=commission
-        ).select_related('manager')
+        ))
     
-    serializer = CommissionReadSerializer(commission)
-    related_serializer = CommissionListSerializer(related_commissions, many=True)
+    serializer = CommissionReadSerializer(commission, context={'request': request})
+    related_serializer = CommissionListSerializer(related_commissions, many=True, context={'request': request})
     
     data = serializer.data
     data['related_commissions'] = related_serializer.data
@@ -421,7 +452,7 @@ def submit_commission(request, pk):
     commission = get_object_or_404(Commission, pk=pk)
     
     # Permission: owner or admin
-    if not request.user.is_staff and commission.consultant != request.user:
+    if not _is_owner_or_admin(request, commission):
         return Response(
             {"detail": "You do not have permission to submit this commission."},
             status=status.HTTP_403_FORBIDDEN
@@ -471,19 +502,13 @@ def approve_commission(request, pk):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        updated_commission = StateTransitionService.transition_to_approved(
+        # Also reports how many related overrides were approved with it
+        updated_commission, related_count = StateTransitionService.transition_to_approved(
             commission,
             actor=request.user,
             notes=serializer.validated_data.get('notes', '')
         )
         
-        # Count related overrides that were also approved
-        related_count = Commission.objects.filter(
-            parent_commission=commission,
-            commission_type='override',
-            state='approved'
-        ).count()
-        
         return Response({
             "id": updated_commission.id,
             "state": updated_commission.state,
@@ -596,7 +621,9 @@ def create_adjustment(request, pk):
             created_by=request.user
         )
         
-        adjustment_data = CommissionReadSerializer(adjustment).data
+        adjustment_data = CommissionReadSerializer(
+            CommissionReadSerializer.prefetch_queryset(Commission.objects.all()).get(pk=adjustment.pk)
+        ).data
         
         return Response(adjustment_data, status=status.HTTP_201_CREATED)
         
@@ -612,19 +639,22 @@ def commission_history(request, pk):
     
     View adjustment history for a commission.
     """
-    original_commission = get_object_or_404(Commission, pk=pk)
+    # Only the columns rendered below; ownership is checked on the FK id
+    original_commission = get_object_or_404(
+        Commission.objects.only('id', 'consultant_id', 'calculated_amount', 'state'), pk=pk
+    )
     
     # Permission check
-    if not request.user.is_staff and original_commission.consultant != request.user:
+    if not _is_owner_or_admin(request, original_commission):
         return Response(
             {"detail": "You do not have permission to view this commission."},
             status=status.HTTP_403_FORBIDDEN
         )
     
     # Get all adjustments
-    adjustments = Commission.objects.filter(
+    adjustments = CommissionListSerializer.prefetch_queryset(Commission.objects.filter(
         adjustment_for=original_commission
-    ).order_by('created_at')
+    )).order_by('created_at')
     
     # Calculate net amount
     net_amount = original_commission.calculated_amount
@@ -638,11 +668,38 @@ def commission_history(request, pk):
             "calculated_amount": str(original_commission.calculated_amount),
             "state": original_commission.state
         },
-        "adjustments": CommissionListSerializer(adjustments, many=True).data,
+        "adjustments": CommissionListSerializer(adjustments, many=True, context={'request': request}).data,
         "net_amount": str(net_amount)
     })
 
 
+def _amount_totals(queryset, sections):
+    """
+    Count, total and per-state calculated_amount sums for several slices of a
+    queryset in one query (sums as Decimals, zero when there are no rows).
+    
+    sections maps a name to (condition, states); the result maps the same names
+    to {'count', 'total', <state>...}.
+    """
+    aggregates = {}
+    for name, (condition, states) in sections.items():
+        aggregates[f'{name}__count'] = Count('id', filter=condition)
+        aggregates[f'{name}__total'] = Sum('calculated_amount', filter=condition)
+        for state in states:
+            aggregates[f'{name}__{state}'] = Sum('calculated_amount', filter=condition & Q(state=state))
+    
+    totals = {name: {} for name in sections}
+    for key, value in queryset.aggregate(**aggregates).items():
+        name, figure = key.split('__', 1)
+        totals[name][figure] = value if figure == 'count' else value or Decimal('0')
+    return totals
+
+
+def _amounts_as_strings(totals):
+    """Render the Decimal sums of an _amount_totals section for the response."""
+    return {key: value if key == 'count' else str(value) for key, value in totals.items()}
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def commission_summary(request):
@@ -652,62 +709,55 @@ def commission_summary(request):
     Dashboard summary of user's earnings.
     """
     # Get date range
-    from datetime import datetime, timedelta
-    
     start_date = request.query_params.get('start_date')
     end_date = request.query_params.get('end_date')
     
     if not start_date or not end_date:
-        # Default to current month
-        today = datetime.now().date()
+        # Default to current month (in the project's time zone)
+        today = timezone.localdate()
         start_date = today.replace(day=1)
         end_date = today
+    else:
+        # Compare transaction_date against dates, not strings
+        try:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except ValueError:
+            return Response(
+                {"detail": "start_date and end_date must be YYYY-MM-DD dates."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
     
-    # Query user's commissions
-    base_commissions = Commission.objects.filter(
-        consultant=request.user,
-        commission_type='base',
+    # User's base and override commissions in the period
+    base = Q(consultant=request.user, commission_type='base')
+    override = Q(manager=request.user, commission_type='override')
+    commissions = Commission.objects.filter(
+        base | override,
         transaction_date__gte=start_date,
         transaction_date__lte=end_date
     )
     
-    override_commissions = Commission.objects.filter(
-        manager=request.user,
-        commission_type='override',
-        transaction_date__gte=start_date,
-        transaction_date__lte=end_date
-    )
+    # Every figure comes from one conditional aggregate; a user with no activity
+    # in range gets zeros from the same single query
+    totals = _amount_totals(commissions, {
+        'base': (base, ['draft', 'submitted', 'approved', 'paid']),
+        'override': (override, ['approved', 'paid']),
+    })
+    base_data = totals['base']
+    override_data = totals['override']
     
-    # Aggregate base commissions
-    base_data = {
-        "count": base_commissions.count(),
-        "total": str(base_commissions.aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0),
-        "draft": str(base_commissions.filter(state='draft').aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0),
-        "submitted": str(base_commissions.filter(state='submitted').aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0),
-        "approved": str(base_commissions.filter(state='approved').aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0),
-        "paid": str(base_commissions.filter(state='paid').aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0)
-    }
-    
-    # Aggregate override commissions
-    override_data = {
-        "count": override_commissions.count(),
-        "total": str(override_commissions.aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0),
-        "approved": str(override_commissions.filter(state='approved').aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0),
-        "paid": str(override_commissions.filter(state='paid').aggregate(Sum('calculated_amount'))['calculated_amount__sum'] or 0)
-    }
-    
-    # Calculate totals
-    total_earnings = float(base_data['total']) + float(override_data['total'])
-    pending_approval = float(base_data['submitted'])
-    ready_for_payout = float(base_data['approved']) + float(override_data['approved'])
+    # Calculate totals (Decimal throughout; strings only in the response)
+    total_earnings = base_data['total'] + override_data['total']
+    pending_approval = base_data['submitted']
+    ready_for_payout = base_data['approved'] + override_data['approved']
     
     return Response({
         "period": {
             "start_date": str(start_date),
             "end_date": str(end_date)
         },
-        "base_commissions": base_data,
-        "override_commissions": override_data,
+        "base_commissions": _amounts_as_strings(base_data),
+        "override_commissions": _amounts_as_strings(override_data),
         "total_earnings": str(total_earnings),
         "pending_approval": str(pending_approval),
         "ready_for_payout": str(ready_for_payout)
@@ -1,3 +1,4 @@
+import sys
 from pathlib import Path
 from decouple import config, Csv
 
@@ -131,6 +132,12 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Test runs (manage.py test) use a cheap hasher: tests create many users and
+# never depend on hash strength. Production keeps Django's default PBKDF2.
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+if TESTING:
+    PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
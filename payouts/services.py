@@ -195,10 +195,13 @@ class PayoutLifecycleService:
         # or use subquery update for large datasets)
         commission_ids = line_items.values_list('commission_id', flat=True)
         
-        # Mark Commissions as PAID
+        # Mark Commissions as PAID (queryset updates skip auto_now, so bump
+        # updated_at explicitly for readers keyed on it)
+        now = timezone.now()
         Commission.objects.filter(id__in=commission_ids).update(
             state='paid',
-            paid_at=timezone.now()
+            paid_at=now,
+            updated_at=now
             # approved_by is kept as original approver
         )
         
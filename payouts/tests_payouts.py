@@ -93,6 +93,8 @@ class PayoutServiceTests(APITestCase):
         self.comm2.refresh_from_db()
         self.assertEqual(self.comm1.state, 'paid')
         self.assertEqual(self.comm2.state, 'paid')
+        # Release is a queryset update, so updated_at is bumped explicitly
+        self.assertEqual(self.comm1.updated_at, self.comm1.paid_at)
 
     def test_lifecycle_void(self):
         """Test Void flow and Unlinking."""